@@ -1,5 +1,10 @@
-from fastapi import APIRouter, Depends, File, UploadFile
+import asyncio
+import logging
+from typing import Awaitable, TypeVar
+
+from fastapi import APIRouter, Depends, File, Query, Request, UploadFile, WebSocket, WebSocketDisconnect
 from fastapi import HTTPException, status
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 
 from ..schemas.chat import (
     ChatCompletionRequest,
@@ -7,22 +12,66 @@ from ..schemas.chat import (
     ChatListResponse,
     FileUploadResponse,
     ChatHistoryResponse,
+    ImportResponse,
+    ProjectCreateRequest,
     ProjectListResponse,
+    ProjectSummary,
+    ReindexRequest,
+    ReindexStatus,
+    SlowRequestSettings,
 )
+from ..services.chat_hub import ChatHub, Subscriber
 from ..services.chat_manager import ChatManager
-from ..services.dependencies import get_chat_manager
+from ..services.dependencies import (
+    get_chat_hub,
+    get_chat_manager,
+    get_sampling_profiler,
+    get_slow_request_recorder,
+)
+from ..services.profiling import SamplingProfiler, SlowRequestRecorder
+from ..services.transfer import NDJSON_MEDIA_TYPE
+
+logger = logging.getLogger(__name__)
 
 api_router = APIRouter()
 
+_T = TypeVar("_T")
+
+# How often a pending request checks whether its client is still connected.
+DISCONNECT_POLL_SECONDS = 0.25
+# Non-standard status popularised by nginx for requests the client abandoned.
+CLIENT_CLOSED_REQUEST = 499
+# Replies one WebSocket connection may have generating at the same time.
+MAX_REPLIES_PER_CONNECTION = 4
+
 
 @api_router.get("/projects", response_model=ProjectListResponse, tags=["projects"])
 async def list_projects(chat_manager: ChatManager = Depends(get_chat_manager)) -> ProjectListResponse:
     return ProjectListResponse(projects=chat_manager.get_projects())
 
 
+@api_router.post(
+    "/projects",
+    response_model=ProjectSummary,
+    status_code=status.HTTP_201_CREATED,
+    tags=["projects"],
+)
+async def create_project(
+    payload: ProjectCreateRequest,
+    chat_manager: ChatManager = Depends(get_chat_manager),
+) -> ProjectSummary:
+    try:
+        return await chat_manager.create_project(payload)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+
+
 @api_router.get("/chats", response_model=ChatListResponse, tags=["chats"])
-async def list_chats(chat_manager: ChatManager = Depends(get_chat_manager)) -> ChatListResponse:
-    return ChatListResponse(chats=chat_manager.get_chats())
+async def list_chats(
+    project_id: str | None = Query(default=None, alias="projectId"),
+    chat_manager: ChatManager = Depends(get_chat_manager),
+) -> ChatListResponse:
+    return ChatListResponse(chats=await chat_manager.get_chats(project_id=project_id))
 
 
 @api_router.post(
@@ -33,15 +82,39 @@ async def list_chats(chat_manager: ChatManager = Depends(get_chat_manager)) -> C
 async def upload_files(
     chat_id: str,
     files: list[UploadFile] = File(...),
+    project_id: str | None = Query(default=None, alias="projectId"),
     chat_manager: ChatManager = Depends(get_chat_manager),
 ) -> FileUploadResponse:
     if not files:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No files provided")
 
-    stored = await chat_manager.store_files(chat_id, files)
+    try:
+        stored = await chat_manager.store_files(chat_id, files, project_id=project_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
     return FileUploadResponse(file_ids=stored)
 
 
+@api_router.get("/chat/{chat_id}/files/{file_id}", tags=["chats"])
+async def download_file(
+    chat_id: str,
+    file_id: str,
+    chat_manager: ChatManager = Depends(get_chat_manager),
+) -> FileResponse:
+    stored = chat_manager.get_file(chat_id, file_id)
+    if stored is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+
+    # FileResponse streams from disk (zero-copy sendfile where the server supports
+    # it) and answers Range requests, so the file is never loaded into memory.
+    record, path = stored
+    return FileResponse(
+        path,
+        media_type=record.content_type or "application/octet-stream",
+        filename=record.filename,
+    )
+
+
 @api_router.post(
     "/chat/{chat_id}/respond",
     response_model=ChatCompletionResponse,
@@ -50,10 +123,13 @@ async def upload_files(
 async def create_completion(
     chat_id: str,
     payload: ChatCompletionRequest,
+    request: Request,
     chat_manager: ChatManager = Depends(get_chat_manager),
 ) -> ChatCompletionResponse:
     try:
-        response = await chat_manager.generate_response(chat_id, payload)
+        response = await _cancel_on_disconnect(request, chat_manager.generate_response(chat_id, payload))
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
     except RuntimeError as exc:  # pragma: no cover - placeholder error handling
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc)) from exc
 
@@ -69,5 +145,244 @@ async def get_chat_messages(
     chat_id: str,
     chat_manager: ChatManager = Depends(get_chat_manager),
 ) -> ChatHistoryResponse:
-    messages = chat_manager.get_chat_messages(chat_id)
+    messages = await chat_manager.get_chat_messages(chat_id)
     return ChatHistoryResponse(messages=messages)
+
+
+@api_router.get("/mcp/graph", tags=["mcp"])
+async def get_graph(
+    query: str,
+    request: Request,
+    points: int | None = Query(default=2000, gt=2),
+    method: str = Query(default="lttb", pattern="^(lttb|minmax)$"),
+    chunk_size: int = Query(default=10_000, alias="chunkSize", gt=0),
+    chat_manager: ChatManager = Depends(get_chat_manager),
+) -> StreamingResponse:
+    """Stream a graph as NDJSON: a summary header, then column chunks of points."""
+    series = await _cancel_on_disconnect(request, chat_manager.get_graph(query, points=points, method=method))
+    return StreamingResponse(series.iter_ndjson(chunk_size), media_type=NDJSON_MEDIA_TYPE)
+
+
+@api_router.get("/export", tags=["transfer"])
+async def export_conversations(
+    project_id: str | None = Query(default=None, alias="projectId"),
+    chat_manager: ChatManager = Depends(get_chat_manager),
+) -> StreamingResponse:
+    try:
+        lines = chat_manager.export_conversations(project_id=project_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    return StreamingResponse(lines, media_type=NDJSON_MEDIA_TYPE)
+
+
+@api_router.post("/import", response_model=ImportResponse, tags=["transfer"])
+async def import_conversations(
+    request: Request,
+    chat_manager: ChatManager = Depends(get_chat_manager),
+) -> ImportResponse:
+    # The body is consumed as a stream so arbitrarily large exports can be loaded.
+    summary = await chat_manager.import_conversations(request.stream())
+    return ImportResponse(projects=summary.projects, messages=summary.messages, skipped=summary.skipped)
+
+
+@api_router.post(
+    "/admin/reindex",
+    response_model=ReindexStatus,
+    status_code=status.HTTP_202_ACCEPTED,
+    tags=["admin"],
+)
+async def start_reindex(
+    payload: ReindexRequest,
+    chat_manager: ChatManager = Depends(get_chat_manager),
+) -> ReindexStatus:
+    try:
+        return chat_manager.start_reindex(payload)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    except RuntimeError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+
+
+@api_router.get("/admin/reindex", response_model=ReindexStatus, tags=["admin"])
+async def get_reindex_status(chat_manager: ChatManager = Depends(get_chat_manager)) -> ReindexStatus:
+    return chat_manager.get_reindex_status()
+
+
+@api_router.delete("/admin/reindex", response_model=ReindexStatus, tags=["admin"])
+async def cancel_reindex(chat_manager: ChatManager = Depends(get_chat_manager)) -> ReindexStatus:
+    return await chat_manager.cancel_reindex()
+
+
+@api_router.get("/admin/prompt-cache", tags=["admin"])
+async def prompt_cache_metrics(chat_manager: ChatManager = Depends(get_chat_manager)) -> dict[str, float]:
+    """Report cached-token ratio, context reuse and mean LLM latency."""
+    return chat_manager.get_prompt_cache_metrics()
+
+
+@api_router.get("/admin/cancellations", tags=["admin"])
+async def cancellation_metrics(chat_manager: ChatManager = Depends(get_chat_manager)) -> dict[str, float]:
+    """Report replies abandoned by their client and the estimated tokens saved."""
+    return chat_manager.get_cancellation_metrics()
+
+
+@api_router.post("/admin/profile", status_code=status.HTTP_202_ACCEPTED, tags=["admin"])
+async def start_profiler(
+    seconds: float = Query(default=30.0, gt=0, le=600),
+    profiler: SamplingProfiler = Depends(get_sampling_profiler),
+) -> dict[str, str]:
+    try:
+        profiler.start(seconds)
+    except RuntimeError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+    return {"status": "running"}
+
+
+@api_router.delete("/admin/profile", tags=["admin"])
+async def stop_profiler(profiler: SamplingProfiler = Depends(get_sampling_profiler)) -> dict[str, str]:
+    profiler.stop()
+    return {"status": "stopped"}
+
+
+@api_router.get("/admin/profile", response_class=PlainTextResponse, tags=["admin"])
+async def download_profile(profiler: SamplingProfiler = Depends(get_sampling_profiler)) -> PlainTextResponse:
+    """Return the last profiling window as collapsed stacks for flame graph tools."""
+    return PlainTextResponse(profiler.collapsed())
+
+
+@api_router.put("/admin/slow-requests", response_model=SlowRequestSettings, tags=["admin"])
+async def configure_slow_requests(
+    payload: SlowRequestSettings,
+    recorder: SlowRequestRecorder = Depends(get_slow_request_recorder),
+) -> SlowRequestSettings:
+    recorder.threshold_ms = payload.threshold_ms
+    return payload
+
+
+@api_router.get("/admin/slow-requests", tags=["admin"])
+async def list_slow_requests(
+    output_format: str = Query(default="json", alias="format", pattern="^(json|collapsed)$"),
+    recorder: SlowRequestRecorder = Depends(get_slow_request_recorder),
+) -> object:
+    traces = recorder.traces()
+    if output_format == "collapsed":
+        return PlainTextResponse("".join(f"{line}\n" for trace in traces for line in trace.collapsed()))
+    return {"thresholdMs": recorder.threshold_ms, "traces": [trace.as_dict() for trace in traces]}
+
+
+@api_router.websocket("/ws")
+async def chat_socket(
+    websocket: WebSocket,
+    chat_manager: ChatManager = Depends(get_chat_manager),
+    chat_hub: ChatHub = Depends(get_chat_hub),
+) -> None:
+    """Multiplex several chats over one connection.
+
+    Client frames are ``subscribe``/``unsubscribe`` with a ``chatId``, or
+    ``message`` with a ``chatId`` plus the fields of ``ChatCompletionRequest``,
+    or ``cancel`` with a ``chatId`` to stop that chat's in-flight replies.
+    The server answers with ``token`` frames while a reply streams, a ``done``
+    frame when it finishes, ``message`` frames for every new message in a
+    subscribed chat, and ``error`` frames for rejected or failed requests. A
+    connection can have at most ``MAX_REPLIES_PER_CONNECTION`` replies
+    generating at once.
+    """
+    await websocket.accept()
+    subscriber = Subscriber()
+    chat_hub.connect(subscriber)
+    writer = asyncio.create_task(_drain_subscriber(websocket, subscriber))
+    # In-flight replies and the chat each one belongs to.
+    responses: dict[asyncio.Task[None], str] = {}
+    try:
+        while True:
+            try:
+                frame = await websocket.receive_json()
+                frame_type = frame.get("type")
+                chat_id = str(frame["chatId"])
+            except (ValueError, KeyError, AttributeError):
+                await subscriber.send({"type": "error", "detail": "Malformed frame"})
+                continue
+
+            if frame_type == "subscribe":
+                chat_hub.subscribe(chat_id, subscriber)
+            elif frame_type == "unsubscribe":
+                chat_hub.unsubscribe(chat_id, subscriber)
+            elif frame_type == "message":
+                if len(responses) >= MAX_REPLIES_PER_CONNECTION:
+                    await subscriber.send(
+                        {"type": "error", "chatId": chat_id, "detail": "Too many replies in flight"}
+                    )
+                    continue
+                chat_hub.subscribe(chat_id, subscriber)
+                task = asyncio.create_task(_stream_reply(chat_manager, subscriber, chat_id, frame))
+                responses[task] = chat_id
+                task.add_done_callback(lambda done: responses.pop(done, None))
+            elif frame_type == "cancel":
+                # The partial reply is saved and published as a ``message`` frame.
+                for task, reply_chat_id in list(responses.items()):
+                    if reply_chat_id == chat_id:
+                        task.cancel()
+            else:
+                await subscriber.send({"type": "error", "chatId": chat_id, "detail": "Unknown frame type"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        chat_hub.disconnect(subscriber)
+        for task in responses:
+            task.cancel()
+        writer.cancel()
+
+
+async def _drain_subscriber(websocket: WebSocket, subscriber: Subscriber) -> None:
+    while True:
+        event = await subscriber.queue.get()
+        if event is None:
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="Client too slow")
+            return
+        await websocket.send_json(event)
+
+
+async def _stream_reply(
+    chat_manager: ChatManager,
+    subscriber: Subscriber,
+    chat_id: str,
+    frame: dict[str, object],
+) -> None:
+    async def on_delta(delta: str) -> None:
+        await subscriber.send({"type": "token", "chatId": chat_id, "delta": delta})
+
+    try:
+        payload = ChatCompletionRequest.model_validate(frame)
+        response = await chat_manager.generate_response(chat_id, payload, on_delta=on_delta, origin=subscriber)
+    except (ValueError, RuntimeError) as exc:
+        await subscriber.send({"type": "error", "chatId": chat_id, "detail": str(exc)})
+        return
+    except Exception:
+        logger.exception("Reply for chat %s failed", chat_id)
+        await subscriber.send({"type": "error", "chatId": chat_id, "detail": "Internal error"})
+        return
+
+    await subscriber.send(
+        {"type": "done", "chatId": chat_id, "response": response.model_dump(by_alias=True, mode="json")}
+    )
+
+
+async def _cancel_on_disconnect(request: Request, work: Awaitable[_T]) -> _T:
+    """Await ``work``, cancelling it as soon as the client goes away.
+
+    Starlette only notices a disconnect when it next talks to the client, which
+    for a plain JSON response is after all upstream work has finished. Polling
+    lets the LLM and MCP calls be abandoned while they are still running.
+    """
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                # Let the task finish its cleanup, such as saving partial output.
+                await asyncio.gather(task, return_exceptions=True)
+                raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
+    finally:
+        task.cancel()
@@ -1,9 +1,33 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from .api.routes import api_router
+from .services.dependencies import (
+    get_chat_hub,
+    get_job_queue,
+    get_loop_monitor,
+    get_slow_request_recorder,
+)
+from .services.profiling import SlowRequestMiddleware
+
 
-app = FastAPI(title="Chat OpenAI Backend", version="0.1.0")
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    job_queue = get_job_queue()
+    loop_monitor = get_loop_monitor()
+    await job_queue.start()
+    await loop_monitor.start()
+    try:
+        yield
+    finally:
+        await loop_monitor.stop()
+        await job_queue.stop()
+
+
+app = FastAPI(title="Chat OpenAI Backend", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -12,6 +36,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(SlowRequestMiddleware, recorder=get_slow_request_recorder())
 
 app.include_router(api_router)
 
@@ -20,3 +45,21 @@ app.include_router(api_router)
 async def health_check() -> dict[str, str]:
     """Return a simple health status for readiness probes."""
     return {"status": "ok"}
+
+
+@app.get("/health/jobs", tags=["system"])
+async def job_queue_metrics() -> dict[str, float]:
+    """Report background queue depth, lag, and outcome counters."""
+    return get_job_queue().metrics()
+
+
+@app.get("/health/connections", tags=["system"])
+async def connection_metrics() -> dict[str, float]:
+    """Report open WebSocket connections and subscribed chats."""
+    return get_chat_hub().metrics()
+
+
+@app.get("/health/loop", tags=["system"])
+async def event_loop_metrics() -> dict[str, float]:
+    """Report how late the event loop runs scheduled callbacks."""
+    return get_loop_monitor().metrics()
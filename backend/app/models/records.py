@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+
+
+@dataclass
+class MessageRecord:
+    message_id: str
+    chat_id: str
+    author: str
+    content: str
+    created_at: datetime
+    embedding: np.ndarray
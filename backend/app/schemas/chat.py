@@ -10,12 +10,29 @@ class ProjectSummary(BaseModel):
     id: str
     name: str
     description: Optional[str] = None
+    chat_count: int = Field(default=0, alias="chatCount")
+
+    class Config:
+        populate_by_name = True
+
+
+class ProjectCreateRequest(BaseModel):
+    id: str
+    name: str
+    description: Optional[str] = None
+    max_hot_messages: Optional[int] = Field(default=None, alias="maxHotMessages", gt=0)
+    llm_concurrency: Optional[int] = Field(default=None, alias="llmConcurrency", gt=0)
+    cache_size: Optional[int] = Field(default=None, alias="cacheSize", ge=0)
+
+    class Config:
+        populate_by_name = True
 
 
 class ChatSessionSummary(BaseModel):
     id: str
     title: str
     updated_at: datetime = Field(..., alias="updatedAt")
+    project_id: Optional[str] = Field(default=None, alias="projectId")
 
     class Config:
         populate_by_name = True
@@ -32,6 +49,7 @@ class ChatListResponse(BaseModel):
 class ChatCompletionRequest(BaseModel):
     message: str
     file_ids: List[str] | None = Field(default=None, alias="fileIds")
+    project_id: Optional[str] = Field(default=None, alias="projectId")
 
 
 class ChatCompletionResponse(BaseModel):
@@ -62,3 +80,36 @@ class ChatMessage(BaseModel):
 
 class ChatHistoryResponse(BaseModel):
     messages: List[ChatMessage]
+
+
+class ImportResponse(BaseModel):
+    projects: int
+    messages: int
+    skipped: int
+
+
+class ReindexRequest(BaseModel):
+    embedder: str = "hash"
+    dimensions: int = Field(default=384, gt=0)
+
+
+class ReindexStatus(BaseModel):
+    state: str
+    embedder: Optional[str] = None
+    dimensions: Optional[int] = None
+    total_segments: int = Field(alias="totalSegments")
+    done_segments: int = Field(alias="doneSegments")
+    embedded_messages: int = Field(alias="embeddedMessages")
+    started_at: Optional[datetime] = Field(default=None, alias="startedAt")
+    finished_at: Optional[datetime] = Field(default=None, alias="finishedAt")
+    error: Optional[str] = None
+
+    class Config:
+        populate_by_name = True
+
+
+class SlowRequestSettings(BaseModel):
+    threshold_ms: Optional[float] = Field(default=None, alias="thresholdMs", ge=0)
+
+    class Config:
+        populate_by_name = True
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict
+
+Event = Dict[str, Any]
+
+
+class Subscriber:
+    """Outbound side of one client connection.
+
+    Events are buffered in a bounded queue that a single writer drains to the
+    socket. Events caused by the client's own requests (its reply tokens and the
+    resulting messages) wait for room in the queue, which slows the upstream
+    token stream down to the client's pace. Events caused by other connections
+    never wait: a client that falls that far behind is dropped.
+    """
+
+    def __init__(self, max_pending: int = 256) -> None:
+        self.queue: asyncio.Queue[Event | None] = asyncio.Queue(maxsize=max_pending)
+        self.chats: set[str] = set()
+        self.dropped = False
+
+    async def send(self, event: Event) -> None:
+        if not self.dropped:
+            await self.queue.put(event)
+
+    def offer(self, event: Event) -> bool:
+        if self.dropped:
+            return False
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self._drop()
+            return False
+        return True
+
+    def _drop(self) -> None:
+        self.dropped = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        # ``None`` tells the writer to close the connection.
+        self.queue.put_nowait(None)
+
+
+class ChatHub:
+    """Fans chat events out to every connection subscribed to that chat."""
+
+    def __init__(self) -> None:
+        self._subscribers: Dict[str, set[Subscriber]] = {}
+        self._connections: set[Subscriber] = set()
+
+    def connect(self, subscriber: Subscriber) -> None:
+        self._connections.add(subscriber)
+
+    def disconnect(self, subscriber: Subscriber) -> None:
+        for chat_id in list(subscriber.chats):
+            self.unsubscribe(chat_id, subscriber)
+        self._connections.discard(subscriber)
+
+    def subscribe(self, chat_id: str, subscriber: Subscriber) -> None:
+        self._subscribers.setdefault(chat_id, set()).add(subscriber)
+        subscriber.chats.add(chat_id)
+
+    def unsubscribe(self, chat_id: str, subscriber: Subscriber) -> None:
+        subscribers = self._subscribers.get(chat_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[chat_id]
+        subscriber.chats.discard(chat_id)
+
+    async def publish(self, chat_id: str, event: Event, origin: Subscriber | None = None) -> None:
+        """Send ``event`` to the chat's subscribers.
+
+        ``origin`` is the connection whose request produced the event. Its copy
+        waits for queue room like the rest of its reply instead of counting
+        against it as a broadcast it failed to keep up with.
+        """
+        subscribers = self._subscribers.get(chat_id, set())
+        for subscriber in list(subscribers):
+            if subscriber is not origin and not subscriber.offer(event):
+                self.disconnect(subscriber)
+        if origin is not None and origin in subscribers:
+            await origin.send(event)
+
+    def metrics(self) -> dict[str, float]:
+        return {
+            "connections": len(self._connections),
+            "subscribed_chats": len(self._subscribers),
+        }
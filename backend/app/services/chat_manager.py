@@ -1,7 +1,15 @@
 from __future__ import annotations
 
-from datetime import datetime
-from typing import Iterable
+import asyncio
+import os
+import secrets
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from datetime import datetime, timedelta
+from functools import partial
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Iterator, TypeVar
 
 from fastapi import UploadFile
 
@@ -10,11 +18,52 @@ from ..schemas.chat import (
     ChatCompletionResponse,
     ChatSessionSummary,
     ChatMessage,
+    ProjectCreateRequest,
     ProjectSummary,
+    ReindexRequest,
+    ReindexStatus,
 )
-from .mcp_client import MCPClient
-from .openai_client import OpenAIClient
-from .vector_store import MessageRecord, VectorStore
+from .chat_hub import ChatHub, Subscriber
+from .embeddings import create_embedder
+from .file_store import FileStore
+from .job_queue import JobQueue
+from .mcp_client import GraphSeries, MCPClient
+from .openai_client import (
+    CancellationStats,
+    Completion,
+    ContextHandleRejected,
+    OpenAIClient,
+    Prompt,
+    PromptCacheStats,
+)
+from .profiling import trace_stage
+from .projects import DEFAULT_PROJECT_ID, ProjectPartition, ProjectQuota
+from .reindex import Reindexer
+from .transfer import ImportSummary, export_ndjson, import_ndjson
+from .vector_store import FileRecord, MessageRecord, VectorStore
+
+# Fixed system block sent as ``instructions`` on every turn. It never changes,
+# so it forms the start of a stable, cacheable prompt prefix.
+SYSTEM_PROMPT = (
+    "You are a helpful assistant running on OpenAI's Responses API. "
+    "Each user turn may start with retrieved conversation context and MCP tool "
+    "insights; use them when they are relevant to the user message."
+)
+
+_T = TypeVar("_T")
+
+_HISTORY_ROLES = {"user": "user", "assistant": "assistant", "system": "developer"}
+
+# Replaying history when no context handle is available is capped, so a long
+# chat cannot overflow the model's context window. Tokens are estimated at
+# about four characters each.
+HISTORY_MAX_MESSAGES = 50
+HISTORY_TOKEN_BUDGET = 8000
+_CHARS_PER_TOKEN = 4
+
+# Damping constant from the original reciprocal rank fusion paper; keeps a
+# single top-ranked hit from dominating the fused order.
+RRF_K = 60
 
 
 class ChatManager:
@@ -25,24 +74,62 @@ class ChatManager:
         llm_client: OpenAIClient,
         vector_store: VectorStore,
         mcp_client: MCPClient,
+        file_store: FileStore,
+        job_queue: JobQueue,
+        chat_hub: ChatHub,
     ) -> None:
         self._llm_client = llm_client
         self._vector_store = vector_store
         self._mcp_client = mcp_client
-        self._projects: list[ProjectSummary] = [
-            ProjectSummary(
-                id="default",
-                name="Getting started",
-                description="Placeholder project showcasing how to hook the MCP tools",
-            )
-        ]
+        self._file_store = file_store
+        self._job_queue = job_queue
+        self._chat_hub = chat_hub
+        self._llm_slots: dict[str, asyncio.Semaphore] = {}
+        self._reindexer = Reindexer(vector_store)
+        # Store queries run NumPy and sorting work; keep it off the event loop.
+        self._store_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="store")
+        # Last provider response per chat. Continuing from it means only the new
+        # turn is sent and processed; the provider already holds the history.
+        self._context_handles: OrderedDict[str, str] = OrderedDict()
+        self._max_context_handles = 10_000
+        # Replies that are queued for storage but not in the store yet, per chat.
+        self._pending_replies: dict[str, dict[str, ChatMessage]] = {}
+        self._prompt_stats = PromptCacheStats()
+        self._cancellation_stats = CancellationStats()
+        # Retrieval only looks this far back from a chat's latest message, so a
+        # turn reads a bounded number of frozen segments however long the chat is.
+        self._search_window = timedelta(days=float(os.getenv("CHAT_SEARCH_WINDOW_DAYS", "7")))
+        self._vector_store.ensure_project(
+            DEFAULT_PROJECT_ID,
+            name="Getting started",
+            description="Placeholder project showcasing how to hook the MCP tools",
+        )
 
     def get_projects(self) -> list[ProjectSummary]:
-        return self._projects
+        return [_project_summary(project) for project in self._vector_store.list_projects()]
+
+    async def create_project(self, payload: ProjectCreateRequest) -> ProjectSummary:
+        if self._vector_store.get_project(payload.id) is not None:
+            raise ValueError(f"Project already exists: {payload.id}")
+
+        defaults = ProjectQuota()
+        quota = ProjectQuota(
+            max_hot_messages=payload.max_hot_messages or defaults.max_hot_messages,
+            llm_concurrency=payload.llm_concurrency or defaults.llm_concurrency,
+            cache_size=defaults.cache_size if payload.cache_size is None else payload.cache_size,
+        )
+        project = await self._store_call(
+            self._vector_store.ensure_project,
+            payload.id,
+            name=payload.name,
+            description=payload.description,
+            quota=quota,
+        )
+        return _project_summary(project)
 
-    def get_chats(self) -> list[ChatSessionSummary]:
-        chat_records = self._vector_store.list_chats()
-        if not chat_records:
+    async def get_chats(self, project_id: str | None = None) -> list[ChatSessionSummary]:
+        chat_records = await self._store_call(self._vector_store.list_chats, project_id=project_id)
+        if not chat_records and project_id is None:
             now = datetime.utcnow()
             return [
                 ChatSessionSummary(id="demo", title="Demo conversation", updated_at=now)
@@ -52,34 +139,278 @@ class ChatManager:
                 id=str(record["id"]),
                 title=str(record["title"]),
                 updated_at=record["updated_at"],
+                project_id=str(record["project_id"]),
             )
             for record in chat_records
         ]
 
-    async def store_files(self, chat_id: str, files: Iterable[UploadFile]) -> list[str]:
+    async def store_files(
+        self,
+        chat_id: str,
+        files: Iterable[UploadFile],
+        project_id: str | None = None,
+    ) -> list[str]:
+        self._require_project(project_id)
         file_ids: list[str] = []
         for uploaded in files:
-            content = await uploaded.read()
-            file_id = self._vector_store.add_file(chat_id=chat_id, filename=uploaded.filename, content=content)
+            blob = await self._file_store.save(uploaded, chat_id)
+            file_id = await self._store_call(
+                self._vector_store.add_file,
+                chat_id=chat_id,
+                filename=uploaded.filename or blob.digest,
+                digest=blob.digest,
+                size=blob.size,
+                content_type=uploaded.content_type,
+                project_id=project_id,
+            )
             file_ids.append(file_id)
         return file_ids
 
+    def get_file(self, chat_id: str, file_id: str) -> tuple[FileRecord, Path] | None:
+        record = self._vector_store.get_file(chat_id, file_id)
+        if record is None:
+            return None
+        path = self._file_store.path(record.digest)
+        if not path.exists():
+            return None
+        return record, path
+
     async def generate_response(
         self,
         chat_id: str,
         payload: ChatCompletionRequest,
+        on_delta: Callable[[str], Awaitable[None]] | None = None,
+        origin: Subscriber | None = None,
     ) -> ChatCompletionResponse:
-        enriched_prompt = await self._augment_prompt(chat_id, payload)
-        model_response = await self._llm_client.generate(enriched_prompt)
-        record = self._vector_store.add_message(
-            chat_id=chat_id,
+        """Answer ``payload``; with ``on_delta`` the reply is streamed as it is generated.
+
+        ``origin`` is the hub connection that sent the request, if any; the
+        messages this turn publishes reach it with flow control rather than as
+        droppable broadcasts. Cancelling the caller's task (for example when the
+        client disconnects) abandons the in-flight MCP and LLM requests. Text
+        already streamed is kept as the assistant message, so the history
+        matches what the user saw.
+        """
+        self._require_project(payload.project_id)
+        reached_llm = False
+        deltas: list[str] = []
+
+        async def collect(delta: str) -> None:
+            deltas.append(delta)
+            assert on_delta is not None
+            await on_delta(delta)
+
+        try:
+            with trace_stage("augment_prompt"):
+                turn, user_message_id = await self._augment_prompt(chat_id, payload, origin)
+            # Each project has its own concurrency budget, so a burst from one
+            # project queues behind its own slots instead of everyone else's.
+            with trace_stage("llm"):
+                async with self._llm_slot(self._vector_store.project_for_chat(chat_id)):
+                    reached_llm = True
+                    completion = await self._call_llm(
+                        chat_id, turn, user_message_id, collect if on_delta is not None else None
+                    )
+        except asyncio.CancelledError:
+            # Each output_text delta carries roughly one token.
+            self._cancellation_stats.record_cancellation(len(deltas), reached_llm=reached_llm)
+            # The provider never finished this turn, so its context handle would
+            # skip it; the next turn replays the stored history instead.
+            self._context_handles.pop(chat_id, None)
+            if deltas:
+                # Shielded so a second cancellation cannot stop the save halfway
+                # and leave its job key or pending reply behind.
+                await asyncio.shield(self._save_reply(chat_id, "".join(deltas), origin))
+            raise
+        self._cancellation_stats.record_completion(completion)
+
+        message = await self._save_reply(chat_id, completion.text, origin)
+        return ChatCompletionResponse(id=message.id, content=message.content, created_at=message.created_at)
+
+    async def _save_reply(self, chat_id: str, content: str, origin: Subscriber | None) -> ChatMessage:
+        # Embedding and indexing the reply is not needed to answer the request,
+        # so it runs on the background queue keyed by the message id.
+        message = ChatMessage(
+            id=secrets.token_hex(8),
             author="assistant",
-            content=model_response,
+            content=content,
+            created_at=datetime.utcnow(),
         )
-        return ChatCompletionResponse(id=record.message_id, content=model_response, created_at=record.created_at)
+        pending = self._pending_replies.setdefault(chat_id, {})
+        pending[message.id] = message
+
+        async def store_reply() -> None:
+            await self._store_call(
+                self._vector_store.add_message,
+                chat_id=chat_id,
+                author="assistant",
+                content=content,
+                message_id=message.id,
+                created_at=message.created_at,
+            )
+            pending.pop(message.id, None)
+            if not pending and self._pending_replies.get(chat_id) is pending:
+                del self._pending_replies[chat_id]
+
+        await self._job_queue.enqueue(f"message:{message.id}", store_reply)
+        await self._publish(chat_id, message, origin)
+        # Segment compaction and retention run at most once per hour.
+        await self._job_queue.enqueue(f"maintenance:{message.created_at:%Y%m%d%H}", self._maintain_store)
+        return message
+
+    async def get_graph(self, query: str, points: int | None = None, method: str = "lttb") -> GraphSeries:
+        """Fetch a graph from MCP, downsampled server-side to ``points`` when given.
+
+        The summary of a downsampled graph still covers every original point.
+        """
+        with trace_stage("mcp.generate_graph"):
+            series = await self._mcp_client.generate_graph(query)
+        if points is not None and len(series) > points:
+            # Downsampling a large series takes long enough to stall other requests.
+            series = await asyncio.to_thread(series.downsample, points, method)
+        return series
 
-    def get_chat_messages(self, chat_id: str) -> list[ChatMessage]:
-        records = self._vector_store.get_messages(chat_id)
+    def get_prompt_cache_metrics(self) -> dict[str, float]:
+        return self._prompt_stats.as_dict()
+
+    def get_cancellation_metrics(self) -> dict[str, float]:
+        return self._cancellation_stats.as_dict()
+
+    async def _call_llm(
+        self,
+        chat_id: str,
+        turn: str,
+        user_message_id: str,
+        on_delta: Callable[[str], Awaitable[None]] | None,
+    ) -> Completion:
+        """Send the turn, continuing from the chat's context handle when there is one.
+
+        Without a handle the whole history is replayed in order, so consecutive
+        turns still share an append-only prefix the provider can cache. If the
+        provider rejects a stale handle before anything was streamed, the turn
+        is retried once with the full history.
+        """
+        handle = self._context_handles.get(chat_id)
+        streamed = False
+
+        async def forward(delta: str) -> None:
+            nonlocal streamed
+            streamed = True
+            assert on_delta is not None
+            await on_delta(delta)
+
+        async def send(prompt: Prompt, previous_response_id: str | None) -> Completion:
+            if on_delta is None:
+                return await self._llm_client.generate(
+                    prompt, instructions=SYSTEM_PROMPT, previous_response_id=previous_response_id
+                )
+            return await self._llm_client.stream(
+                prompt, forward, instructions=SYSTEM_PROMPT, previous_response_id=previous_response_id
+            )
+
+        turn_input = {"role": "user", "content": turn}
+        completion: Completion | None = None
+        reused = False
+        if handle is not None:
+            try:
+                completion = await send([turn_input], handle)
+                reused = True
+            except ContextHandleRejected:
+                if streamed:
+                    raise
+                self._context_handles.pop(chat_id, None)
+        if completion is None:
+            history = await self._history_input(chat_id, user_message_id)
+            completion = await send([*history, turn_input], None)
+
+        self._prompt_stats.record(completion, reused_context=reused)
+        if completion.response_id:
+            self._context_handles[chat_id] = completion.response_id
+            self._context_handles.move_to_end(chat_id)
+            if len(self._context_handles) > self._max_context_handles:
+                self._context_handles.popitem(last=False)
+        return completion
+
+    async def _history_input(self, chat_id: str, exclude_id: str) -> list[dict[str, str]]:
+        """Return the chat's most recent messages as input items, within the history budget.
+
+        Replies still waiting on the job queue are included, so the replay never
+        misses the previous answer.
+        """
+        with trace_stage("store.recent_messages"):
+            records = await self._store_call(self._vector_store.recent_messages, chat_id, HISTORY_MAX_MESSAGES)
+        messages = [(record.message_id, record.author, record.content, record.created_at) for record in records]
+        stored = {record.message_id for record in records}
+        messages.extend(
+            (message.id, message.author, message.content, message.created_at)
+            for message in self._pending_replies.get(chat_id, {}).values()
+            if message.id not in stored
+        )
+        messages.sort(key=lambda message: message[3])
+
+        history: list[dict[str, str]] = []
+        budget = HISTORY_TOKEN_BUDGET
+        for message_id, author, content, _ in reversed(messages[-HISTORY_MAX_MESSAGES:]):
+            if message_id == exclude_id:
+                continue
+            budget -= len(content) // _CHARS_PER_TOKEN + 1
+            if budget < 0:
+                break
+            history.append({"role": _HISTORY_ROLES.get(author, "user"), "content": content})
+        history.reverse()
+        return history
+
+    async def _store_call(self, func: Callable[..., _T], *args: Any, **kwargs: Any) -> _T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._store_executor, partial(func, *args, **kwargs))
+
+    async def _publish(self, chat_id: str, message: ChatMessage, origin: Subscriber | None) -> None:
+        await self._chat_hub.publish(
+            chat_id,
+            {"type": "message", "chatId": chat_id, "message": message.model_dump(by_alias=True, mode="json")},
+            origin=origin,
+        )
+
+    def _require_project(self, project_id: str | None) -> None:
+        if project_id is not None and self._vector_store.get_project(project_id) is None:
+            raise ValueError(f"Unknown project: {project_id}")
+
+    def _llm_slot(self, project_id: str) -> asyncio.Semaphore:
+        slot = self._llm_slots.get(project_id)
+        if slot is None:
+            project = self._vector_store.get_project(project_id)
+            limit = project.quota.llm_concurrency if project else ProjectQuota().llm_concurrency
+            slot = asyncio.Semaphore(limit)
+            self._llm_slots[project_id] = slot
+        return slot
+
+    def export_conversations(self, project_id: str | None = None) -> Iterator[bytes]:
+        self._require_project(project_id)
+        return export_ndjson(self._vector_store, project_id=project_id)
+
+    async def import_conversations(self, chunks: AsyncIterator[bytes]) -> ImportSummary:
+        return await import_ndjson(self._vector_store, chunks)
+
+    def start_reindex(self, payload: ReindexRequest) -> ReindexStatus:
+        """Start (or resume) re-embedding every message; raises if one is running."""
+        embedder = create_embedder(payload.embedder, payload.dimensions)
+        self._reindexer.start(embedder)
+        return self.get_reindex_status()
+
+    async def cancel_reindex(self) -> ReindexStatus:
+        """Stop a running re-index; finished work is kept for a later resume."""
+        await self._reindexer.cancel()
+        return self.get_reindex_status()
+
+    def get_reindex_status(self) -> ReindexStatus:
+        return ReindexStatus(**asdict(self._reindexer.progress))
+
+    async def _maintain_store(self) -> None:
+        for record in await self._store_call(self._vector_store.maintain):
+            self._file_store.release(record.digest, record.chat_id)
+
+    async def get_chat_messages(self, chat_id: str) -> list[ChatMessage]:
+        records = await self._store_call(self._vector_store.get_messages, chat_id)
         return [
             ChatMessage(
                 id=record.message_id,
@@ -94,20 +425,54 @@ class ChatManager:
         self,
         chat_id: str,
         payload: ChatCompletionRequest,
-    ) -> str:
-        self._vector_store.add_message(chat_id=chat_id, author="user", content=payload.message)
+        origin: Subscriber | None,
+    ) -> tuple[str, str]:
+        """Store the user message and build this turn's input.
 
-        similar_messages: list[MessageRecord] = self._vector_store.similar_messages(
-            chat_id=chat_id,
-            content=payload.message,
-            limit=5,
+        Retrieved context and tool insights change every turn, so they go into
+        the new turn itself rather than ahead of the history. Everything before
+        the turn stays byte-identical across turns. Returns the turn text and
+        the stored user message id.
+        """
+        with trace_stage("store.add_message"):
+            user_record = await self._store_call(
+                self._vector_store.add_message,
+                chat_id=chat_id,
+                author="user",
+                content=payload.message,
+                project_id=payload.project_id,
+            )
+        await self._publish(
+            chat_id,
+            ChatMessage(
+                id=user_record.message_id,
+                author=user_record.author,
+                content=user_record.content,
+                created_at=user_record.created_at,
+            ),
+            origin,
         )
+
+        with trace_stage("store.hybrid_search"):
+            results = await self._store_call(
+                self._vector_store.hybrid_search,
+                chat_id=chat_id,
+                content=payload.message,
+                limit=10,
+                max_age=self._search_window,
+            )
+        # The new message is already stored and would top both rankings.
+        rankings = [
+            [record for record in ranking if record.message_id != user_record.message_id]
+            for ranking in (results.vector, results.lexical)
+        ]
+        similar_messages = _reciprocal_rank_fusion(rankings, limit=5)
         context_snippets = "\n".join(f"- {record.content}" for record in similar_messages)
 
-        tool_summaries = await self._mcp_client.get_tool_summaries(payload.message)
+        with trace_stage("mcp.get_tool_summaries"):
+            tool_summaries = await self._mcp_client.get_tool_summaries(payload.message)
 
         prompt_sections = [
-            "You are a helpful assistant running on OpenAI's Responses API.",
             "Conversation context:",
             context_snippets or "(no prior context)",
             "Relevant MCP tool insights:",
@@ -119,4 +484,29 @@ class ChatManager:
         if payload.file_ids:
             prompt_sections.append(f"Files referenced: {', '.join(payload.file_ids)}")
 
-        return "\n\n".join(prompt_sections)
+        return "\n\n".join(prompt_sections), user_record.message_id
+
+
+def _project_summary(project: ProjectPartition) -> ProjectSummary:
+    return ProjectSummary(
+        id=project.project_id,
+        name=project.name,
+        description=project.description,
+        chat_count=len(project.chats),
+    )
+
+
+def _reciprocal_rank_fusion(
+    rankings: list[list[MessageRecord]],
+    limit: int,
+    k: int = RRF_K,
+) -> list[MessageRecord]:
+    """Merge several best-first rankings into one using reciprocal rank fusion."""
+    scores: dict[str, float] = {}
+    records: dict[str, MessageRecord] = {}
+    for ranking in rankings:
+        for rank, record in enumerate(ranking, start=1):
+            scores[record.message_id] = scores.get(record.message_id, 0.0) + 1.0 / (k + rank)
+            records[record.message_id] = record
+    ordered = sorted(scores, key=scores.__getitem__, reverse=True)
+    return [records[message_id] for message_id in ordered[:limit]]
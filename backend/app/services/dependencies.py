@@ -2,9 +2,14 @@ from __future__ import annotations
 
 from functools import lru_cache
 
+from .chat_hub import ChatHub
 from .chat_manager import ChatManager
+from .file_store import FileStore
+from .job_queue import JobQueue
+from .loop_monitor import EventLoopMonitor
 from .mcp_client import MCPClient
 from .openai_client import OpenAIClient
+from .profiling import SamplingProfiler, SlowRequestRecorder
 from .vector_store import VectorStore
 
 
@@ -13,6 +18,37 @@ def get_chat_manager() -> ChatManager:
     llm_client = OpenAIClient()
     vector_store = VectorStore()
     mcp_client = MCPClient()
+    file_store = FileStore()
     return ChatManager(
-        llm_client=llm_client, vector_store=vector_store, mcp_client=mcp_client
+        llm_client=llm_client,
+        vector_store=vector_store,
+        mcp_client=mcp_client,
+        file_store=file_store,
+        job_queue=get_job_queue(),
+        chat_hub=get_chat_hub(),
     )
+
+
+@lru_cache(maxsize=1)
+def get_chat_hub() -> ChatHub:
+    return ChatHub()
+
+
+@lru_cache(maxsize=1)
+def get_job_queue() -> JobQueue:
+    return JobQueue()
+
+
+@lru_cache(maxsize=1)
+def get_slow_request_recorder() -> SlowRequestRecorder:
+    return SlowRequestRecorder()
+
+
+@lru_cache(maxsize=1)
+def get_sampling_profiler() -> SamplingProfiler:
+    return SamplingProfiler()
+
+
+@lru_cache(maxsize=1)
+def get_loop_monitor() -> EventLoopMonitor:
+    return EventLoopMonitor()
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from typing import Protocol, Sequence
+
+import numpy as np
+
+
+class Embedder(Protocol):
+    name: str
+    dimensions: int
+
+    def encode(self, text: str) -> np.ndarray: ...
+
+    def encode_batch(self, texts: Sequence[str]) -> np.ndarray: ...
+
+
+class HashEmbedder:
+    """Deterministic placeholder embedder seeded from the text hash."""
+
+    name = "hash"
+
+    def __init__(self, dimensions: int = 384) -> None:
+        self.dimensions = dimensions
+
+    def encode(self, text: str) -> np.ndarray:
+        rng = np.random.default_rng(abs(hash(text)) % (2**32))
+        vector = rng.normal(size=self.dimensions)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode_batch(self, texts: Sequence[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, self.dimensions))
+        return np.stack([self.encode(text) for text in texts])
+
+
+EMBEDDERS: dict[str, type[HashEmbedder]] = {HashEmbedder.name: HashEmbedder}
+
+
+def create_embedder(name: str, dimensions: int) -> Embedder:
+    try:
+        factory = EMBEDDERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown embedder: {name}") from None
+    return factory(dimensions=dimensions)
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import secrets
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict
+
+from fastapi import UploadFile
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class StoredBlob:
+    digest: str
+    size: int
+
+
+class FileStore:
+    """Content-addressed blob store on local disk.
+
+    Uploads are written once under their SHA-256 digest and shared by every chat
+    that references them. Per-chat reference counts decide when a blob can be
+    removed from disk.
+    """
+
+    def __init__(self, root: Path | None = None) -> None:
+        self._root = root or Path(os.getenv("CHAT_FILE_STORE_DIR", "data/files"))
+        self._tmp_dir = self._root / "tmp"
+        self._tmp_dir.mkdir(parents=True, exist_ok=True)
+        self._references: Dict[str, Counter[str]] = {}
+        # Commits run in worker threads while releases run on the event loop;
+        # the lock keeps a blob from being unlinked as a new reference lands.
+        self._lock = threading.Lock()
+
+    def path(self, digest: str) -> Path:
+        return self._root / digest[:2] / digest
+
+    async def save(self, upload: UploadFile, chat_id: str) -> StoredBlob:
+        """Stream an upload to disk while hashing it; duplicates are not rewritten.
+
+        ``chat_id`` takes a reference to the blob in the same step that commits
+        it, so a concurrent release cannot delete a blob that is being shared.
+        Disk writes run in a worker thread so large uploads do not stall the
+        event loop.
+        """
+        hasher = hashlib.sha256()
+        size = 0
+        tmp_path = self._tmp_dir / secrets.token_hex(8)
+        handle = await asyncio.to_thread(tmp_path.open, "wb")
+        try:
+            try:
+                while chunk := await upload.read(_CHUNK_SIZE):
+                    hasher.update(chunk)
+                    await asyncio.to_thread(handle.write, chunk)
+                    size += len(chunk)
+            finally:
+                await asyncio.to_thread(handle.close)
+
+            digest = hasher.hexdigest()
+            await asyncio.to_thread(self._commit, tmp_path, digest, chat_id)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        return StoredBlob(digest=digest, size=size)
+
+    def _commit(self, tmp_path: Path, digest: str, chat_id: str) -> None:
+        target = self.path(digest)
+        with self._lock:
+            if target.exists():
+                tmp_path.unlink()
+            else:
+                target.parent.mkdir(exist_ok=True)
+                os.replace(tmp_path, target)
+            self._references.setdefault(digest, Counter())[chat_id] += 1
+
+    def retain(self, digest: str, chat_id: str) -> None:
+        with self._lock:
+            self._references.setdefault(digest, Counter())[chat_id] += 1
+
+    def release(self, digest: str, chat_id: str) -> None:
+        with self._lock:
+            owners = self._references.get(digest)
+            if owners is None or owners[chat_id] <= 0:
+                return
+            owners[chat_id] -= 1
+            if owners[chat_id] == 0:
+                del owners[chat_id]
+            if not owners:
+                del self._references[digest]
+                self.path(digest).unlink(missing_ok=True)
+
+    def reference_count(self, digest: str) -> int:
+        with self._lock:
+            return sum(self._references.get(digest, Counter()).values())
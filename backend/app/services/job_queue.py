@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+JobFunc = Callable[[], Awaitable[None] | None]
+
+
+@dataclass
+class _Job:
+    key: str
+    func: JobFunc
+    enqueued_at: float = field(default_factory=time.monotonic)
+    attempts: int = 0
+
+
+class JobQueue:
+    """Bounded in-process queue for work that can run after a response is sent.
+
+    Jobs are identified by a key; enqueuing a key that is pending, running or
+    recently completed is a no-op, which makes producers safe to retry. Failed
+    jobs are retried with exponential backoff. ``enqueue`` waits when the queue
+    is full so producers slow down instead of growing memory without bound.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        max_size: int = 1000,
+        max_attempts: int = 3,
+        retry_delay: float = 0.5,
+        completed_history: int = 10_000,
+    ) -> None:
+        self._worker_count = workers
+        self._max_size = max_size
+        self._max_attempts = max_attempts
+        self._retry_delay = retry_delay
+        self._completed_history = completed_history
+        self._queue: asyncio.Queue[_Job] | None = None
+        self._workers: list[asyncio.Task[None]] = []
+        self._active: set[str] = set()
+        self._completed: OrderedDict[str, None] = OrderedDict()
+        self._processed = 0
+        self._failed = 0
+        self._last_lag = 0.0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self) -> None:
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self._max_size)
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"job-worker-{index}")
+            for index in range(self._worker_count)
+        ]
+
+    async def stop(self) -> None:
+        """Drain outstanding jobs, then stop the workers."""
+        if not self._workers or self._queue is None:
+            return
+        await self._queue.join()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def enqueue(self, key: str, func: JobFunc) -> bool:
+        """Schedule ``func`` under ``key``; return ``False`` if the key is already known.
+
+        When the queue is not running (for example outside the application
+        lifespan) the job runs inline so the work is never lost.
+        """
+        if key in self._active or key in self._completed:
+            return False
+
+        job = _Job(key=key, func=func)
+        self._active.add(key)
+        if not self.running or self._queue is None:
+            await self._run(job)
+            return True
+
+        await self._queue.put(job)
+        return True
+
+    def metrics(self) -> dict[str, float]:
+        depth = self._queue.qsize() if self._queue is not None else 0
+        return {
+            "depth": depth,
+            "in_flight": len(self._active) - depth,
+            "processed": self._processed,
+            "failed": self._failed,
+            "last_lag_seconds": self._last_lag,
+        }
+
+    async def _worker(self) -> None:
+        assert self._queue is not None
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: _Job) -> None:
+        self._last_lag = time.monotonic() - job.enqueued_at
+        while True:
+            job.attempts += 1
+            try:
+                result = job.func()
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception:
+                if job.attempts >= self._max_attempts:
+                    logger.exception("Background job %s failed after %d attempts", job.key, job.attempts)
+                    self._failed += 1
+                    self._active.discard(job.key)
+                    return
+                await asyncio.sleep(self._retry_delay * 2 ** (job.attempts - 1))
+                continue
+            break
+
+        self._processed += 1
+        self._active.discard(job.key)
+        self._completed[job.key] = None
+        if len(self._completed) > self._completed_history:
+            self._completed.popitem(last=False)
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import math
+import re
+from array import array
+from collections import Counter
+
+# Identifiers such as ``db.events_v2``, ``ERR-1042`` or query ids keep their
+# punctuation so they can be matched verbatim; their parts are indexed as well.
+_TOKEN_PATTERN = re.compile(r"[0-9A-Za-z_]+(?:[.:/-][0-9A-Za-z_]+)*")
+_PART_PATTERN = re.compile(r"[.:/-]")
+
+
+def tokenize(text: str) -> list[str]:
+    tokens: list[str] = []
+    for match in _TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group(0)
+        tokens.append(token)
+        if _PART_PATTERN.search(token):
+            tokens.extend(part for part in _PART_PATTERN.split(token) if part)
+    return tokens
+
+
+class CorpusStats:
+    """Collection-wide BM25 statistics shared by several inverted indexes.
+
+    Scores from different indexes are only comparable when they use the same
+    document count, average length and document frequencies.
+    """
+
+    def __init__(self) -> None:
+        self.document_count = 0
+        self.total_length = 0
+        self._document_frequency: Counter[str] = Counter()
+
+    def add(self, counts: Counter[str]) -> None:
+        self.document_count += 1
+        self.total_length += sum(counts.values())
+        self._document_frequency.update(counts.keys())
+
+    def document_frequency(self, term: str) -> int:
+        return self._document_frequency[term]
+
+
+class InvertedIndex:
+    """Incremental BM25 index over a set of documents.
+
+    Documents are identified by their insertion position. Each posting list is a
+    pair of compact unsigned-int arrays (document ids, term frequencies) that only
+    ever grows at the tail, so ``add`` is proportional to the document length.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75) -> None:
+        self._k1 = k1
+        self._b = b
+        self._postings: dict[str, tuple[array, array]] = {}
+        self._doc_lengths = array("I")
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def add(self, text: str) -> int:
+        return self.add_counts(Counter(tokenize(text)))
+
+    def add_counts(self, counts: Counter[str]) -> int:
+        """Add a document given as term frequencies, as returned by ``Counter(tokenize(text))``."""
+        doc_id = len(self._doc_lengths)
+        for term, frequency in counts.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = (array("I"), array("I"))
+                self._postings[term] = postings
+            postings[0].append(doc_id)
+            postings[1].append(frequency)
+
+        length = sum(counts.values())
+        self._doc_lengths.append(length)
+        self._total_length += length
+        return doc_id
+
+    def score(self, query: str, stats: CorpusStats | None = None) -> dict[int, float]:
+        """Return BM25 scores keyed by document id for documents matching ``query``.
+
+        With ``stats`` the IDF and length normalisation come from the wider
+        collection instead of this index alone.
+        """
+        document_count = stats.document_count if stats is not None else len(self._doc_lengths)
+        if not document_count or not self._doc_lengths:
+            return {}
+
+        total_length = stats.total_length if stats is not None else self._total_length
+        average_length = total_length / document_count or 1.0
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            doc_ids, frequencies = postings
+            document_frequency = stats.document_frequency(term) if stats is not None else len(doc_ids)
+            idf = math.log(1.0 + (document_count - document_frequency + 0.5) / (document_frequency + 0.5))
+            for doc_id, frequency in zip(doc_ids, frequencies):
+                norm = self._k1 * (1.0 - self._b + self._b * self._doc_lengths[doc_id] / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self._k1 + 1.0) / (frequency + norm)
+        return scores
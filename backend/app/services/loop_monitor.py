@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+
+class EventLoopMonitor:
+    """Measures event-loop lag by how late a periodic sleep wakes up."""
+
+    def __init__(self, interval: float = 0.1, smoothing: float = 0.1) -> None:
+        self._interval = interval
+        self._smoothing = smoothing
+        self._task: asyncio.Task[None] | None = None
+        self._last = 0.0
+        self._mean = 0.0
+        self._max = 0.0
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="loop-monitor")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def metrics(self) -> dict[str, float]:
+        return {
+            "last_lag_seconds": self._last,
+            "mean_lag_seconds": self._mean,
+            "max_lag_seconds": self._max,
+        }
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.perf_counter() + self._interval
+            await asyncio.sleep(self._interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            self._last = lag
+            self._mean += self._smoothing * (lag - self._mean)
+            self._max = max(self._max, lag)
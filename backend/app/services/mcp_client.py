@@ -1,6 +1,59 @@
 from __future__ import annotations
 
-from typing import Any
+import asyncio
+import json
+from dataclasses import dataclass
+from typing import Any, Iterator
+
+import numpy as np
+
+from ..utils.downsampling import lttb, min_max, summarize
+
+
+@dataclass
+class GraphSeries:
+    """A graph result in columnar form: one array per axis.
+
+    A downsampled series carries the summary of the series it came from, so
+    its statistics describe the data rather than the points kept for display.
+    """
+
+    type: str
+    x: np.ndarray
+    y: np.ndarray
+    description: str
+    source_summary: dict[str, float] | None = None
+
+    def __len__(self) -> int:
+        return len(self.y)
+
+    def downsample(self, target: int, method: str = "lttb") -> GraphSeries:
+        if method == "lttb":
+            indices = lttb(self.x, self.y, target)
+        elif method == "minmax":
+            indices = min_max(self.y, target)
+        else:
+            raise ValueError(f"Unknown downsampling method: {method}")
+        return GraphSeries(
+            type=self.type,
+            x=self.x[indices],
+            y=self.y[indices],
+            description=self.description,
+            source_summary=self.summary(),
+        )
+
+    def summary(self) -> dict[str, float]:
+        if self.source_summary is not None:
+            return self.source_summary
+        return summarize(self.x, self.y)
+
+    def iter_ndjson(self, chunk_size: int = 10_000) -> Iterator[bytes]:
+        """Yield a header line with the summary, then the points in column chunks."""
+        header = {"type": self.type, "description": self.description, "summary": self.summary()}
+        yield json.dumps(header).encode() + b"\n"
+        for start in range(0, len(self), chunk_size):
+            chunk = {"x": self.x[start:start + chunk_size].tolist(), "y": self.y[start:start + chunk_size].tolist()}
+            yield json.dumps(chunk).encode() + b"\n"
 
 
 class MCPClient:
@@ -14,24 +67,26 @@ class MCPClient:
 
     async def get_tool_summaries(self, query: str) -> str:
         await self.ensure_connection()
+        graph = await self.generate_graph(query)
+        # Only summary statistics go into the prompt; raw series can be huge, so
+        # they are computed in a worker thread.
+        summary = await asyncio.to_thread(graph.summary)
         return (
             "MCP tools ready. In future iterations this will include ClickHouse search results "
             "and generated analytics for the prompt: "
-            f"{query}"
+            f"{query}\n"
+            f"Graph summary ({graph.description}): {json.dumps(summary)}"
         )
 
     async def search_clickhouse(self, query: str) -> list[dict[str, Any]]:
         await self.ensure_connection()
         return [{"title": "Placeholder search result", "snippet": f"Query: {query}"}]
 
-    async def generate_graph(self, query: str) -> dict[str, Any]:
+    async def generate_graph(self, query: str) -> GraphSeries:
         await self.ensure_connection()
-        return {
-            "type": "line",
-            "data": [
-                {"label": "t-3", "value": 42},
-                {"label": "t-2", "value": 45},
-                {"label": "t-1", "value": 49},
-            ],
-            "description": f"Mock graph for query: {query}",
-        }
+        return GraphSeries(
+            type="line",
+            x=np.array([-3.0, -2.0, -1.0]),
+            y=np.array([42.0, 45.0, 49.0]),
+            description=f"Mock graph for query: {query}",
+        )
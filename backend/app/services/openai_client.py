@@ -1,11 +1,103 @@
 from __future__ import annotations
 
 import os
+import time
+from dataclasses import dataclass
 from functools import lru_cache
 from pathlib import Path
+from typing import Any, Awaitable, Callable, Union
 
 import httpx
-from openai import AsyncOpenAI, OpenAIError
+from openai import AsyncOpenAI, BadRequestError, NotFoundError, OpenAIError
+
+# Either a bare string or a list of ``{"role": ..., "content": ...}`` input items.
+Prompt = Union[str, list[dict[str, str]]]
+
+_EMPTY_RESPONSE = "I could not generate a response."
+
+
+class ContextHandleRejected(RuntimeError):
+    """The provider no longer accepts the ``previous_response_id`` a request continued from."""
+
+
+@dataclass
+class Completion:
+    text: str
+    response_id: str | None = None
+    input_tokens: int = 0
+    cached_tokens: int = 0
+    output_tokens: int = 0
+    elapsed: float = 0.0
+
+
+@dataclass
+class PromptCacheStats:
+    """Running totals that show how much of each prompt the provider served from cache."""
+
+    requests: int = 0
+    reused_contexts: int = 0
+    input_tokens: int = 0
+    cached_tokens: int = 0
+    elapsed_seconds: float = 0.0
+
+    def record(self, completion: Completion, reused_context: bool) -> None:
+        self.requests += 1
+        self.reused_contexts += int(reused_context)
+        self.input_tokens += completion.input_tokens
+        self.cached_tokens += completion.cached_tokens
+        self.elapsed_seconds += completion.elapsed
+
+    def as_dict(self) -> dict[str, float]:
+        return {
+            "requests": self.requests,
+            "reused_contexts": self.reused_contexts,
+            "input_tokens": self.input_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cached_token_ratio": self.cached_tokens / self.input_tokens if self.input_tokens else 0.0,
+            "mean_latency_seconds": self.elapsed_seconds / self.requests if self.requests else 0.0,
+        }
+
+
+@dataclass
+class CancellationStats:
+    """Counts replies abandoned by their client and estimates the tokens not spent on them.
+
+    A cancelled reply is assumed to have needed as many tokens as the average
+    completed one. Tokens it had already streamed are subtracted, and a reply
+    cancelled before reaching the model also saves the average prompt.
+    """
+
+    completed: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cancelled: int = 0
+    cancelled_before_llm: int = 0
+    partial_tokens: int = 0
+    tokens_saved: float = 0.0
+
+    def record_completion(self, completion: Completion) -> None:
+        self.completed += 1
+        self.input_tokens += completion.input_tokens
+        self.output_tokens += completion.output_tokens
+
+    def record_cancellation(self, partial_tokens: int, reached_llm: bool) -> None:
+        mean_input = self.input_tokens / self.completed if self.completed else 0.0
+        mean_output = self.output_tokens / self.completed if self.completed else 0.0
+        self.cancelled += 1
+        self.partial_tokens += partial_tokens
+        self.tokens_saved += max(0.0, mean_output - partial_tokens)
+        if not reached_llm:
+            self.cancelled_before_llm += 1
+            self.tokens_saved += mean_input
+
+    def as_dict(self) -> dict[str, float]:
+        return {
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "cancelled_before_llm": self.cancelled_before_llm,
+            "partial_tokens": self.partial_tokens,
+            "estimated_tokens_saved": round(self.tokens_saved),
+        }
 
 
 class OpenAIClient:
@@ -27,24 +119,95 @@ class OpenAIClient:
         self._client = AsyncOpenAI(api_key=api_key, http_client=http_client)
         self._model = model
 
-    async def generate(self, prompt: str) -> str:
+    async def generate(
+        self,
+        prompt: Prompt,
+        instructions: str | None = None,
+        previous_response_id: str | None = None,
+    ) -> Completion:
+        started = time.perf_counter()
         try:
             response = await self._client.responses.create(
-                model=self._model,
-                input=prompt,
+                **self._request(prompt, instructions, previous_response_id)
             )
         except OpenAIError as exc:  # pragma: no cover - depends on remote API
-            raise RuntimeError("Failed to fetch response from OpenAI.") from exc
-
-        output_text: str | None = response.output_text
-        if not output_text:
-            return "I could not generate a response."
-        return output_text
+            raise _request_error(exc, previous_response_id, "Failed to fetch response from OpenAI.") from exc
+
+        return _completion(response, started)
+
+    async def stream(
+        self,
+        prompt: Prompt,
+        on_delta: Callable[[str], Awaitable[None]],
+        instructions: str | None = None,
+        previous_response_id: str | None = None,
+    ) -> Completion:
+        """Pass output text deltas to ``on_delta`` as the model produces them."""
+        started = time.perf_counter()
+        chunks: list[str] = []
+        final = None
+        try:
+            events = await self._client.responses.create(
+                **self._request(prompt, instructions, previous_response_id),
+                stream=True,
+            )
+            # Leaving the block closes the HTTP stream, so a cancelled caller
+            # stops generation upstream instead of leaving it running.
+            async with events:
+                async for event in events:
+                    if event.type == "response.output_text.delta":
+                        chunks.append(event.delta)
+                        await on_delta(event.delta)
+                    elif event.type == "response.completed":
+                        final = event.response
+        except OpenAIError as exc:  # pragma: no cover - depends on remote API
+            raise _request_error(exc, previous_response_id, "Failed to stream response from OpenAI.") from exc
+
+        if final is None:
+            return Completion(text="".join(chunks) or _EMPTY_RESPONSE, elapsed=time.perf_counter() - started)
+        return _completion(final, started)
+
+    def _request(
+        self,
+        prompt: Prompt,
+        instructions: str | None,
+        previous_response_id: str | None,
+    ) -> dict[str, Any]:
+        request: dict[str, Any] = {"model": self._model, "input": prompt}
+        if instructions:
+            request["instructions"] = instructions
+        if previous_response_id:
+            request["previous_response_id"] = previous_response_id
+        return request
 
     async def aclose(self) -> None:
         await self._http_client.aclose()
 
 
+def _request_error(exc: OpenAIError, previous_response_id: str | None, message: str) -> RuntimeError:
+    # Expired or unknown response ids come back as a 404, or as a 400 that
+    # names the parameter; anything else is not the handle's fault.
+    if previous_response_id and (
+        isinstance(exc, NotFoundError)
+        or (isinstance(exc, BadRequestError) and exc.param == "previous_response_id")
+    ):
+        return ContextHandleRejected(f"OpenAI rejected previous response {previous_response_id}.")
+    return RuntimeError(message)
+
+
+def _completion(response: Any, started: float) -> Completion:
+    usage = getattr(response, "usage", None)
+    details = getattr(usage, "input_tokens_details", None)
+    return Completion(
+        text=response.output_text or _EMPTY_RESPONSE,
+        response_id=response.id,
+        input_tokens=getattr(usage, "input_tokens", 0) or 0,
+        cached_tokens=getattr(details, "cached_tokens", 0) or 0,
+        output_tokens=getattr(usage, "output_tokens", 0) or 0,
+        elapsed=time.perf_counter() - started,
+    )
+
+
 @lru_cache(maxsize=1)
 def _resolve_openai_api_key() -> str | None:
     """Resolve the OpenAI API key from the environment or a nearby .env file."""
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterator, MutableMapping
+
+_current_trace: ContextVar[RequestTrace | None] = ContextVar("current_trace", default=None)
+_NO_STAGE = nullcontext()
+
+
+@dataclass
+class RequestTrace:
+    """Per-stage timings for one request; stage names nest as ``outer;inner``."""
+
+    name: str
+    started_at: float = field(default_factory=time.time)
+    duration: float = 0.0
+    stages: list[tuple[str, float]] = field(default_factory=list)
+    _stack: list[str] = field(default_factory=list, repr=False)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        self._stack.append(name)
+        path = ";".join(self._stack)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append((path, time.perf_counter() - started))
+            self._stack.pop()
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "startedAt": self.started_at,
+            "durationMs": self.duration * 1000,
+            "stages": [{"stage": path, "durationMs": seconds * 1000} for path, seconds in self.stages],
+        }
+
+    def collapsed(self) -> list[str]:
+        """Render the trace as collapsed-stack lines weighted in microseconds of self time."""
+        children: Counter[str] = Counter()
+        for path, seconds in self.stages:
+            parent = path.rpartition(";")[0]
+            if parent:
+                children[parent] += seconds
+        lines = []
+        own = self.duration - sum(seconds for path, seconds in self.stages if ";" not in path)
+        if own > 0:
+            lines.append(f"{self.name} {int(own * 1e6)}")
+        for path, seconds in self.stages:
+            self_time = seconds - children[path]
+            if self_time > 0:
+                lines.append(f"{self.name};{path} {int(self_time * 1e6)}")
+        return lines
+
+
+def trace_stage(name: str) -> AbstractContextManager[None]:
+    """Time a block as a stage of the current request; a no-op when tracing is off."""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NO_STAGE
+    return trace.stage(name)
+
+
+class SlowRequestRecorder:
+    """Keeps the most recent request traces that exceeded a latency threshold."""
+
+    def __init__(self, threshold_ms: float | None = None, keep: int = 50) -> None:
+        if threshold_ms is None and os.getenv("CHAT_SLOW_REQUEST_MS"):
+            threshold_ms = float(os.environ["CHAT_SLOW_REQUEST_MS"])
+        self.threshold_ms = threshold_ms
+        self._traces: deque[RequestTrace] = deque(maxlen=keep)
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms is not None
+
+    def record(self, trace: RequestTrace) -> None:
+        if self.threshold_ms is not None and trace.duration * 1000 >= self.threshold_ms:
+            self._traces.append(trace)
+
+    def traces(self) -> list[RequestTrace]:
+        return list(self._traces)
+
+
+Scope = MutableMapping[str, Any]
+ASGIApp = Callable[[Scope, Callable[[], Awaitable[Any]], Callable[[Any], Awaitable[None]]], Awaitable[None]]
+
+
+class SlowRequestMiddleware:
+    """Attach a ``RequestTrace`` to HTTP requests while slow-request capture is on."""
+
+    def __init__(self, app: ASGIApp, recorder: SlowRequestRecorder) -> None:
+        self._app = app
+        self._recorder = recorder
+
+    async def __call__(self, scope: Scope, receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or not self._recorder.enabled:
+            await self._app(scope, receive, send)
+            return
+
+        trace = RequestTrace(name=f"{scope['method']} {scope['path']}")
+        token = _current_trace.set(trace)
+        started = time.perf_counter()
+        try:
+            await self._app(scope, receive, send)
+        finally:
+            trace.duration = time.perf_counter() - started
+            _current_trace.reset(token)
+            self._recorder.record(trace)
+
+
+class SamplingProfiler:
+    """Wall-clock sampling profiler that runs for a fixed window in its own thread.
+
+    Every ``interval`` seconds it records the stack of each other thread, keyed
+    in collapsed-stack form (``thread;outer;...;inner``), which flamegraph.pl,
+    speedscope and similar tools read directly.
+    """
+
+    def __init__(self, interval: float = 0.005) -> None:
+        self._interval = interval
+        self._stacks: Counter[str] = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration: float) -> None:
+        if self.running:
+            raise RuntimeError("The profiler is already running.")
+        with self._lock:
+            self._stacks = Counter()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(time.monotonic() + duration,),
+            name="sampling-profiler",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def collapsed(self) -> str:
+        with self._lock:
+            stacks = sorted(self._stacks.items())
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def _run(self, deadline: float) -> None:
+        while time.monotonic() < deadline and not self._stop.wait(self._interval):
+            self._sample()
+
+    def _sample(self) -> None:
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        samples = []
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            samples.append(";".join(reversed(stack)))
+        with self._lock:
+            self._stacks.update(samples)
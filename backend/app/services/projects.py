@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict
+
+import numpy as np
+
+from .segments import ChatPartition, partition_directory
+
+DEFAULT_PROJECT_ID = "default"
+
+
+@dataclass
+class ProjectQuota:
+    """Resources a single project may hold before it is throttled or evicted."""
+
+    max_hot_messages: int = 50_000
+    llm_concurrency: int = 4
+    cache_size: int = 1024
+
+
+@dataclass
+class ProjectPartition:
+    """Chats, quota and embedding cache belonging to one project."""
+
+    project_id: str
+    name: str
+    description: str | None = None
+    quota: ProjectQuota = field(default_factory=ProjectQuota)
+    chats: Dict[str, ChatPartition] = field(default_factory=dict)
+    hot_messages: int = 0
+    _embedding_cache: OrderedDict[str, np.ndarray] = field(default_factory=OrderedDict, repr=False)
+    # Searches run concurrently in worker threads and all touch the cache.
+    _cache_lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def encode(self, text: str, encoder: Callable[[str], np.ndarray]) -> np.ndarray:
+        """Return the embedding for ``text`` from this project's LRU cache."""
+        with self._cache_lock:
+            cached = self._embedding_cache.get(text)
+            if cached is not None:
+                self._embedding_cache.move_to_end(text)
+                return cached
+
+        embedding = encoder(text)
+        if self.quota.cache_size > 0:
+            with self._cache_lock:
+                self._embedding_cache[text] = embedding
+                if len(self._embedding_cache) > self.quota.cache_size:
+                    self._embedding_cache.popitem(last=False)
+        return embedding
+
+    def clear_cache(self) -> None:
+        with self._cache_lock:
+            self._embedding_cache.clear()
+
+    def directory(self, root: Path, chat_id: str) -> Path:
+        return partition_directory(partition_directory(root, self.project_id), chat_id)
+
+    def enforce_quota(self, root: Path) -> None:
+        """Freeze this project's oldest hot segments until it fits its memory quota.
+
+        Each chat's newest segment is left alone: it is the one still receiving
+        messages, and freezing it would make every later append open a new
+        segment for the same bucket. The quota is therefore soft, and a project
+        with many chats can stay above it by up to one segment per chat.
+        """
+        if self.hot_messages <= self.quota.max_hot_messages:
+            return
+
+        candidates = sorted(
+            (
+                (segment.start, chat_id, segment)
+                for chat_id, partition in self.chats.items()
+                for segment in partition.segments[:-1]
+                if segment.hot
+            ),
+            key=lambda item: item[0],
+        )
+        for _, chat_id, segment in candidates:
+            if self.hot_messages <= self.quota.max_hot_messages:
+                break
+            self.hot_messages -= segment.freeze(self.directory(root, chat_id))
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from .embeddings import Embedder
+from .segments import Segment
+from .vector_store import VectorStore
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReindexProgress:
+    state: str = "idle"
+    embedder: str | None = None
+    dimensions: int | None = None
+    total_segments: int = 0
+    done_segments: int = 0
+    embedded_messages: int = 0
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    error: str | None = None
+
+
+class Reindexer:
+    """Re-embeds the whole store in the background and swaps the result in atomically.
+
+    Queries keep using the current embeddings while the job runs. Hot segments
+    get their new vectors collected in memory, and frozen segments are rewritten
+    to new files beside the live ones. Segments created or frozen meanwhile are
+    handled by catch-up passes, so the swap under the store's write lock only
+    repoints segments and never touches segment data on disk. Work done so far
+    is kept if the job fails or is cancelled, so starting it again with the
+    same embedder resumes where it stopped.
+    """
+
+    def __init__(self, store: VectorStore, batch_size: int = 256, workers: int = 4) -> None:
+        self._store = store
+        self._batch_size = batch_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reindex")
+        self._task: asyncio.Task[None] | None = None
+        self._target: Embedder | None = None
+        self._embeddings: dict[str, np.ndarray] = {}
+        self._prepared: dict[Segment, Path] = {}
+        self._done: set[Segment] = set()
+        self.progress = ReindexProgress()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, embedder: Embedder) -> None:
+        if self.running:
+            raise RuntimeError("A re-index is already running.")
+
+        resuming = (
+            self._target is not None
+            and self._target.name == embedder.name
+            and self._target.dimensions == embedder.dimensions
+        )
+        if not resuming:
+            self._discard()
+            self._target = embedder
+        self.progress = ReindexProgress(
+            state="running",
+            embedder=embedder.name,
+            dimensions=embedder.dimensions,
+            done_segments=len(self._done),
+            started_at=datetime.utcnow(),
+        )
+        self._task = asyncio.create_task(self._run(), name="reindex")
+
+    async def cancel(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run(self) -> None:
+        assert self._target is not None
+        try:
+            while True:
+                self.progress.state = "running"
+                await self._catch_up(self._target)
+                self.progress.state = "swapping"
+                unprepared, cancelled = await self._swap(self._target)
+                if not unprepared:
+                    self._prepared = {}
+                    self._embeddings = {}
+                    self._done = set()
+                    self._target = None
+                    self.progress.state = "done"
+                if cancelled:
+                    raise asyncio.CancelledError
+                if not unprepared:
+                    return
+        except asyncio.CancelledError:
+            if self.progress.state != "done":
+                self.progress.state = "cancelled"
+            raise
+        except Exception as exc:
+            logger.exception("Re-index failed")
+            self.progress.state = "failed"
+            self.progress.error = str(exc)
+        finally:
+            self.progress.finished_at = datetime.utcnow()
+
+    async def _swap(self, embedder: Embedder) -> tuple[list[Segment], bool]:
+        """Run the swap to completion and report whether the job was cancelled meanwhile.
+
+        The swap runs in a worker thread that cannot be interrupted, so giving
+        up on it early would leave the job's state pointing at files the store
+        has already adopted or deleted.
+        """
+        # The swap holds the store's write lock; run it off the event loop.
+        # It refuses when a segment was frozen after the last pass, and the
+        # next pass prepares that segment outside the lock.
+        swap = asyncio.get_running_loop().run_in_executor(
+            self._executor, self._store.swap_embedder, embedder, self._embeddings, self._prepared
+        )
+        cancelled = False
+        while not swap.done():
+            try:
+                await asyncio.shield(swap)
+            except asyncio.CancelledError:
+                cancelled = True
+        return swap.result(), cancelled
+
+    async def _catch_up(self, embedder: Embedder) -> None:
+        """Re-embed every segment that is new, or frozen since its hot records were embedded."""
+        # Listing takes the store's read lock, which waits while maintenance writes.
+        segments = await asyncio.get_running_loop().run_in_executor(self._executor, self._store.list_segments)
+        pending = [
+            (segment, directory)
+            for segment, directory in segments
+            if segment not in self._done or (not segment.hot and segment not in self._prepared)
+        ]
+        self.progress.total_segments = len(segments)
+        self.progress.done_segments = len(segments) - len(pending)
+        for segment, directory in pending:
+            await self._reembed_segment(embedder, segment, directory)
+            self._done.add(segment)
+            self.progress.done_segments += 1
+
+    async def _reembed_segment(self, embedder: Embedder, segment: Segment, directory: Path) -> None:
+        loop = asyncio.get_running_loop()
+        hot = segment.hot
+        if hot:
+            records = list(segment.records())
+            pending = records
+        else:
+            # Frozen segments load as fresh copies, so they can be modified freely.
+            records = await loop.run_in_executor(self._executor, segment.records)
+            pending = []
+            for record in records:
+                # Records embedded while the segment was still hot keep those vectors.
+                embedding = self._embeddings.pop(record.message_id, None)
+                if embedding is None:
+                    pending.append(record)
+                else:
+                    record.embedding = embedding
+
+        batches = [pending[start:start + self._batch_size] for start in range(0, len(pending), self._batch_size)]
+        vectors = await asyncio.gather(
+            *(
+                loop.run_in_executor(self._executor, embedder.encode_batch, [record.content for record in batch])
+                for batch in batches
+            )
+        )
+        for batch, batch_vectors in zip(batches, vectors):
+            for record, vector in zip(batch, batch_vectors):
+                if hot:
+                    self._embeddings[record.message_id] = vector
+                else:
+                    record.embedding = vector
+            self.progress.embedded_messages += len(batch)
+
+        if not hot and segment.path is not None:
+            self._prepared[segment] = await loop.run_in_executor(
+                self._executor, segment.write_copy, records, directory
+            )
+
+    def _discard(self) -> None:
+        for segment, path in self._prepared.items():
+            # A segment that already adopted its prepared copy reads from it.
+            if path != segment.path:
+                path.unlink(missing_ok=True)
+        self._prepared = {}
+        self._embeddings = {}
+        self._done = set()
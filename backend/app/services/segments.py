@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import bisect
+import hashlib
+import secrets
+import shutil
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Iterator
+
+import numpy as np
+
+from ..models.records import MessageRecord
+from .lexical_index import CorpusStats, InvertedIndex, tokenize
+
+
+class Segment:
+    """Messages of one chat that fall into a single time bucket.
+
+    A hot segment keeps its records and lexical index in memory. Freezing a
+    segment writes it to a compressed ``.npz`` file and drops both; a frozen
+    segment is read back transiently whenever a query needs it.
+    """
+
+    def __init__(self, start: datetime, end: datetime) -> None:
+        self.start = start
+        self.end = end
+        self.size = 0
+        self.path: Path | None = None
+        self._records: list[MessageRecord] | None = []
+        self._index: InvertedIndex | None = InvertedIndex()
+        self._matrix: np.ndarray | None = None
+
+    @property
+    def hot(self) -> bool:
+        return self._records is not None
+
+    def append(self, record: MessageRecord, counts: Counter[str]) -> None:
+        assert self._records is not None and self._index is not None
+        self._records.append(record)
+        self._index.add_counts(counts)
+        self.size += 1
+
+    def records(self) -> list[MessageRecord]:
+        """Return the segment's records without building a lexical index."""
+        if self._records is not None:
+            return self._records
+        assert self.path is not None
+        return _read_records(self.path)
+
+    def load(self) -> tuple[list[MessageRecord], InvertedIndex]:
+        if self._records is not None and self._index is not None:
+            return self._records, self._index
+
+        assert self.path is not None
+        records = _read_records(self.path)
+        index = InvertedIndex()
+        for record in records:
+            index.add(record.content)
+        return records, index
+
+    def search_view(self) -> tuple[list[MessageRecord], InvertedIndex, np.ndarray]:
+        """Return records, lexical index and a stacked embedding matrix for scoring."""
+        records, index = self.load()
+        if self._records is None:
+            return records, index, _stack_embeddings(records)
+        matrix = self._matrix
+        if matrix is None or len(matrix) != len(records):
+            # Rebuilt lazily after appends; concurrent readers may both rebuild it.
+            matrix = _stack_embeddings(records)
+            self._matrix = matrix
+        return records, index, matrix
+
+    def freeze(self, directory: Path) -> int:
+        """Move the segment to disk and return how many in-memory records it released."""
+        if self._records is None:
+            return 0
+        self.path = self.write_copy(self._records, directory)
+        self._records = None
+        self._index = None
+        self._matrix = None
+        return self.size
+
+    def write_copy(self, records: list[MessageRecord], directory: Path) -> Path:
+        """Write ``records`` to a new file for this segment without adopting it."""
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{self.start:%Y%m%dT%H%M%S}-{secrets.token_hex(4)}.npz"
+        _write_records(path, records)
+        return path
+
+    def reembed(self, embed: Callable[[MessageRecord], np.ndarray], prepared_path: Path | None = None) -> None:
+        """Switch the segment to new embeddings.
+
+        Hot records are updated in place. A frozen segment adopts
+        ``prepared_path``, a copy written ahead of time with the new embeddings.
+        """
+        if self._records is not None:
+            for record in self._records:
+                record.embedding = embed(record)
+            self._matrix = None
+            return
+
+        assert self.path is not None and prepared_path is not None
+        previous = self.path
+        if previous == prepared_path:
+            return
+        self.path = prepared_path
+        previous.unlink(missing_ok=True)
+
+
+class ChatPartition:
+    """All segments of one chat, oldest first.
+
+    BM25 statistics are kept for the chat as a whole, so every segment's index
+    is scored against the same IDF and average length and the scores can be
+    merged across segments.
+    """
+
+    def __init__(self, chat_id: str, span: timedelta) -> None:
+        self.chat_id = chat_id
+        self.span = span
+        self.segments: list[Segment] = []
+        self.updated_at: datetime | None = None
+        self.lexical_stats = CorpusStats()
+
+    @property
+    def hot_size(self) -> int:
+        return sum(segment.size for segment in self.segments if segment.hot)
+
+    def append(self, record: MessageRecord) -> None:
+        segment = self._hot_segment_for(record.created_at)
+        counts = Counter(tokenize(record.content))
+        segment.append(record, counts)
+        self.lexical_stats.add(counts)
+        if self.updated_at is None or record.created_at > self.updated_at:
+            self.updated_at = record.created_at
+
+    def message_ids_between(self, start: datetime, end: datetime) -> set[str]:
+        """Return the ids of messages in segments overlapping ``[start, end]``."""
+        return {
+            record.message_id
+            for segment in list(self.segments)
+            if segment.start <= end and start < segment.end
+            for record in segment.records()
+        }
+
+    def iter_records(self, since: datetime | None = None) -> Iterator[list[MessageRecord]]:
+        """Yield each segment's records, skipping segments that end before ``since``."""
+        for segment in list(self.segments):
+            if since is not None and segment.end < since:
+                continue
+            yield segment.records()
+
+    def iter_search_views(
+        self, since: datetime | None = None
+    ) -> Iterator[tuple[list[MessageRecord], InvertedIndex, np.ndarray]]:
+        for segment in list(self.segments):
+            if since is not None and segment.end < since:
+                continue
+            yield segment.search_view()
+
+    def freeze_older_than(self, cutoff: datetime, directory: Path) -> int:
+        return sum(
+            segment.freeze(directory)
+            for segment in self.segments
+            if segment.hot and segment.end <= cutoff
+        )
+
+    def archive(self, directory: Path, archive_directory: Path) -> None:
+        for segment in self.segments:
+            segment.freeze(directory)
+        archive_directory.parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(str(directory), str(archive_directory))
+
+    def delete(self, directory: Path) -> None:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    def _hot_segment_for(self, timestamp: datetime) -> Segment:
+        latest = self.segments[-1] if self.segments else None
+        if latest is not None and latest.hot and latest.start <= timestamp < latest.end:
+            return latest
+        # Imports can reach back past the newest segment; insert by start so
+        # the list stays oldest first. A bucket that was already frozen gets a
+        # second, hot segment next to it.
+        start = _bucket_start(timestamp, self.span)
+        position = bisect.bisect_right(self.segments, start, key=lambda segment: segment.start)
+        previous = self.segments[position - 1] if position else None
+        if previous is not None and previous.hot and previous.start == start:
+            return previous
+        segment = Segment(start=start, end=start + self.span)
+        self.segments.insert(position, segment)
+        return segment
+
+
+def partition_directory(root: Path, chat_id: str) -> Path:
+    return root / hashlib.sha1(chat_id.encode()).hexdigest()[:16]
+
+
+def _bucket_start(timestamp: datetime, span: timedelta) -> datetime:
+    epoch = datetime(1970, 1, 1, tzinfo=timestamp.tzinfo)
+    return epoch + ((timestamp - epoch) // span) * span
+
+
+def _stack_embeddings(records: list[MessageRecord]) -> np.ndarray:
+    if not records:
+        return np.empty((0, 0))
+    return np.stack([record.embedding for record in records])
+
+
+def _write_records(path: Path, records: list[MessageRecord]) -> None:
+    np.savez_compressed(
+        path,
+        message_ids=np.array([record.message_id for record in records]),
+        chat_ids=np.array([record.chat_id for record in records]),
+        authors=np.array([record.author for record in records]),
+        contents=np.array([record.content for record in records]),
+        created_at=np.array([record.created_at for record in records], dtype="datetime64[us]"),
+        embeddings=np.stack([record.embedding for record in records]).astype(np.float32),
+    )
+
+
+def _read_records(path: Path) -> list[MessageRecord]:
+    with np.load(path, allow_pickle=False) as data:
+        return [
+            MessageRecord(
+                message_id=str(message_id),
+                chat_id=str(chat_id),
+                author=str(author),
+                content=str(content),
+                created_at=created_at.item(),
+                embedding=embedding,
+            )
+            for message_id, chat_id, author, content, created_at, embedding in zip(
+                data["message_ids"],
+                data["chat_ids"],
+                data["authors"],
+                data["contents"],
+                data["created_at"],
+                data["embeddings"],
+            )
+        ]
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import AsyncIterator, Iterator
+
+import numpy as np
+
+from ..models.records import MessageRecord
+from .projects import DEFAULT_PROJECT_ID, ProjectQuota
+from .vector_store import VectorStore
+
+# Export format: one JSON object per line. ``project`` lines come first, then
+# one ``message`` line per stored message. Embeddings are base64-encoded
+# little-endian float32, which is far smaller than a JSON list of floats.
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+@dataclass
+class ImportSummary:
+    projects: int = 0
+    messages: int = 0
+    skipped: int = 0
+
+
+def export_ndjson(store: VectorStore, project_id: str | None = None) -> Iterator[bytes]:
+    for project in store.list_projects():
+        if project_id is not None and project.project_id != project_id:
+            continue
+        yield _line(
+            {
+                "type": "project",
+                "id": project.project_id,
+                "name": project.name,
+                "description": project.description,
+                "maxHotMessages": project.quota.max_hot_messages,
+                "llmConcurrency": project.quota.llm_concurrency,
+                "cacheSize": project.quota.cache_size,
+            }
+        )
+
+    for owner, record in store.iter_records(project_id=project_id):
+        yield _line(
+            {
+                "type": "message",
+                "projectId": owner,
+                "chatId": record.chat_id,
+                "id": record.message_id,
+                "author": record.author,
+                "content": record.content,
+                "createdAt": record.created_at.isoformat(),
+                "embedding": base64.b64encode(np.asarray(record.embedding, dtype="<f4").tobytes()).decode(),
+            }
+        )
+
+
+async def import_ndjson(
+    store: VectorStore,
+    chunks: AsyncIterator[bytes],
+    batch_size: int = 5000,
+) -> ImportSummary:
+    """Load an export stream into ``store`` in fixed-size batches.
+
+    Messages whose id already exists in their chat are counted as skipped, so a
+    failed import can be retried with the same stream.
+    """
+    summary = ImportSummary()
+    batch: dict[str, list[MessageRecord]] = {}
+    pending = 0
+
+    async def flush() -> None:
+        nonlocal batch, pending
+        for owner, records in batch.items():
+            loaded = await asyncio.to_thread(store.bulk_load, records, project_id=owner)
+            summary.messages += loaded
+            summary.skipped += len(records) - loaded
+        batch = {}
+        pending = 0
+
+    async for line in _iter_lines(chunks):
+        try:
+            entry = json.loads(line)
+            entry_type = entry["type"]
+        except (ValueError, KeyError, TypeError):
+            summary.skipped += 1
+            continue
+
+        if entry_type == "project":
+            try:
+                project_id, name, description, quota = _project_entry(entry)
+            except (ValueError, KeyError, TypeError):
+                summary.skipped += 1
+                continue
+            # ensure_project takes the store's write lock; never wait for it on the loop.
+            await asyncio.to_thread(
+                store.ensure_project, project_id, name=name, description=description, quota=quota
+            )
+            summary.projects += 1
+        elif entry_type == "message":
+            try:
+                owner, record = _message_record(entry)
+            except (ValueError, KeyError, TypeError):
+                summary.skipped += 1
+                continue
+            if store.get_project(owner) is None:
+                await asyncio.to_thread(store.ensure_project, owner, name=owner)
+            batch.setdefault(owner, []).append(record)
+            pending += 1
+            if pending >= batch_size:
+                await flush()
+        else:
+            summary.skipped += 1
+
+    await flush()
+    return summary
+
+
+def _project_entry(entry: dict[str, object]) -> tuple[str, str, str | None, ProjectQuota]:
+    defaults = ProjectQuota()
+    quota = ProjectQuota(
+        max_hot_messages=int(entry.get("maxHotMessages", defaults.max_hot_messages)),
+        llm_concurrency=int(entry.get("llmConcurrency", defaults.llm_concurrency)),
+        cache_size=int(entry.get("cacheSize", defaults.cache_size)),
+    )
+    description = entry.get("description")
+    return (
+        str(entry["id"]),
+        str(entry.get("name") or entry["id"]),
+        str(description) if description is not None else None,
+        quota,
+    )
+
+
+def _message_record(entry: dict[str, object]) -> tuple[str, MessageRecord]:
+    encoded = entry.get("embedding")
+    embedding = (
+        np.frombuffer(base64.b64decode(str(encoded)), dtype="<f4").astype(np.float64)
+        if encoded
+        else np.empty(0)
+    )
+    created_at = datetime.fromisoformat(str(entry["createdAt"]))
+    if created_at.tzinfo is not None:
+        # The store keeps naive UTC timestamps; mixing in aware ones breaks comparisons.
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+    record = MessageRecord(
+        message_id=str(entry["id"]),
+        chat_id=str(entry["chatId"]),
+        author=str(entry["author"]),
+        content=str(entry["content"]),
+        created_at=created_at,
+        embedding=embedding,
+    )
+    return str(entry.get("projectId") or DEFAULT_PROJECT_ID), record
+
+
+def _line(entry: dict[str, object]) -> bytes:
+    return json.dumps(entry, ensure_ascii=False).encode() + b"\n"
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
@@ -1,90 +1,438 @@
 from __future__ import annotations
 
+import os
 import secrets
 from dataclasses import dataclass
-from datetime import datetime
-from typing import Dict
+from datetime import datetime, timedelta
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, Mapping, TypeVar
 
 import numpy as np
 
+from ..models.records import MessageRecord
+from ..utils.locks import ReadWriteLock
+from .embeddings import Embedder, HashEmbedder
+from .projects import DEFAULT_PROJECT_ID, ProjectPartition, ProjectQuota
+from .segments import ChatPartition, Segment
+
+
+_Method = TypeVar("_Method", bound=Callable[..., Any])
+
+
+def _reads(method: _Method) -> _Method:
+    @wraps(method)
+    def wrapper(self: VectorStore, *args: Any, **kwargs: Any) -> Any:
+        with self._lock.read():
+            return method(self, *args, **kwargs)
+
+    return wrapper  # type: ignore[return-value]
+
+
+def _writes(method: _Method) -> _Method:
+    @wraps(method)
+    def wrapper(self: VectorStore, *args: Any, **kwargs: Any) -> Any:
+        with self._lock.write():
+            return method(self, *args, **kwargs)
+
+    return wrapper  # type: ignore[return-value]
+
 
 @dataclass
-class MessageRecord:
-    message_id: str
+class FileRecord:
+    file_id: str
     chat_id: str
-    author: str
-    content: str
-    created_at: datetime
-    embedding: np.ndarray
+    filename: str
+    content_type: str | None
+    digest: str
+    size: int
+
+
+@dataclass
+class HybridResults:
+    """Vector and lexical rankings for the same query, best match first."""
+
+    vector: list[MessageRecord]
+    lexical: list[MessageRecord]
 
 
 class VectorStore:
-    """Very small in-memory store with cosine similarity search."""
+    """Small time-partitioned store with cosine similarity and BM25 search.
 
-    def __init__(self, embedding_dimensions: int = 384) -> None:
-        self._embedding_dimensions = embedding_dimensions
-        self._messages: list[MessageRecord] = []
-        self._files: Dict[str, Dict[str, bytes]] = {}
+    Chats belong to projects, and each chat is split into fixed-span segments.
+    Recent segments stay in memory; ``maintain`` freezes older ones to
+    compressed files on disk and expires chats that have been idle for longer
+    than the retention period. A project that exceeds its memory quota has its
+    own oldest segments frozen first, so it cannot push other projects to disk.
+
+    The store is thread-safe: queries share a read lock and can run in parallel
+    worker threads, while mutations take the write lock.
+    """
+
+    def __init__(
+        self,
+        embedding_dimensions: int = 384,
+        embedder: Embedder | None = None,
+        segment_span: timedelta = timedelta(days=1),
+        hot_window: timedelta = timedelta(days=2),
+        search_window: timedelta | None = None,
+        retention: timedelta | None = None,
+        archive_expired: bool | None = None,
+        data_dir: Path | None = None,
+    ) -> None:
+        self._embedder: Embedder = embedder or HashEmbedder(dimensions=embedding_dimensions)
+        self._segment_span = segment_span
+        self._hot_window = hot_window
+        self._search_window = search_window
+        if retention is None and os.getenv("CHAT_RETENTION_DAYS"):
+            retention = timedelta(days=float(os.environ["CHAT_RETENTION_DAYS"]))
+        self._retention = retention
+        if archive_expired is None:
+            archive_expired = os.getenv("CHAT_RETENTION_ACTION", "delete") == "archive"
+        self._archive_expired = archive_expired
+        data_dir = data_dir or Path(os.getenv("CHAT_SEGMENT_DIR", "data/segments"))
+        self._segment_dir = data_dir / "live"
+        self._archive_dir = data_dir / "archive"
+        self._projects: Dict[str, ProjectPartition] = {}
+        self._chat_projects: Dict[str, str] = {}
+        self._files: Dict[str, Dict[str, FileRecord]] = {}
+        self._lock = ReadWriteLock()
+
+    @property
+    def embedder(self) -> Embedder:
+        return self._embedder
 
     def _encode(self, text: str) -> np.ndarray:
-        rng = np.random.default_rng(abs(hash(text)) % (2**32))
-        vector = rng.normal(size=self._embedding_dimensions)
-        norm = np.linalg.norm(vector)
-        return vector / norm if norm else vector
+        return self._embedder.encode(text)
+
+    @_writes
+    def ensure_project(
+        self,
+        project_id: str,
+        name: str,
+        description: str | None = None,
+        quota: ProjectQuota | None = None,
+    ) -> ProjectPartition:
+        project = self._projects.get(project_id)
+        if project is None:
+            project = ProjectPartition(
+                project_id=project_id,
+                name=name,
+                description=description,
+                quota=quota or ProjectQuota(),
+            )
+            self._projects[project_id] = project
+        return project
+
+    def get_project(self, project_id: str) -> ProjectPartition | None:
+        return self._projects.get(project_id)
+
+    def list_projects(self) -> list[ProjectPartition]:
+        return list(self._projects.values())
 
-    def add_message(self, chat_id: str, author: str, content: str) -> MessageRecord:
-        embedding = self._encode(content)
+    def project_for_chat(self, chat_id: str) -> str:
+        return self._chat_projects.get(chat_id, DEFAULT_PROJECT_ID)
+
+    def _chat(self, chat_id: str) -> tuple[ProjectPartition, ChatPartition] | None:
+        project = self._projects.get(self._chat_projects.get(chat_id, ""))
+        if project is None:
+            return None
+        return project, project.chats[chat_id]
+
+    def _chat_or_create(
+        self,
+        chat_id: str,
+        project_id: str | None,
+    ) -> tuple[ProjectPartition, ChatPartition]:
+        """Return a chat's partition; a new chat joins ``project_id`` or the default project."""
+        found = self._chat(chat_id)
+        if found is not None:
+            return found
+
+        if project_id is None:
+            project = self.ensure_project(DEFAULT_PROJECT_ID, name="Default")
+        elif project_id in self._projects:
+            project = self._projects[project_id]
+        else:
+            raise ValueError(f"Unknown project: {project_id}")
+        partition = ChatPartition(chat_id=chat_id, span=self._segment_span)
+        project.chats[chat_id] = partition
+        self._chat_projects[chat_id] = project.project_id
+        return project, partition
+
+    @_writes
+    def add_message(
+        self,
+        chat_id: str,
+        author: str,
+        content: str,
+        message_id: str | None = None,
+        created_at: datetime | None = None,
+        project_id: str | None = None,
+    ) -> MessageRecord:
+        project, partition = self._chat_or_create(chat_id, project_id)
+        embedding = project.encode(content, self._encode)
         record = MessageRecord(
-            message_id=secrets.token_hex(8),
+            message_id=message_id or secrets.token_hex(8),
             chat_id=chat_id,
             author=author,
             content=content,
-            created_at=datetime.utcnow(),
+            created_at=created_at or datetime.utcnow(),
             embedding=embedding,
         )
-        self._messages.append(record)
+        partition.append(record)
+        project.hot_messages += 1
+        project.enforce_quota(self._segment_dir)
         return record
 
-    def similar_messages(self, chat_id: str, content: str, limit: int = 5) -> list[MessageRecord]:
-        query_embedding = self._encode(content)
-        scored: list[tuple[float, MessageRecord]] = []
-        for record in self._messages:
-            if record.chat_id != chat_id:
-                continue
-            score = float(np.dot(query_embedding, record.embedding))
-            scored.append((score, record))
-        scored.sort(key=lambda item: item[0], reverse=True)
-        return [record for _, record in scored[:limit]]
+    @_writes
+    def bulk_load(self, records: Iterable[MessageRecord], project_id: str | None = None) -> int:
+        """Append already-embedded records without going through ``add_message``.
 
-    def list_chats(self) -> list[dict[str, object]]:
+        Records are grouped per chat and appended in time order, and project
+        quotas are enforced once per batch. Records whose embedding does not
+        match the store's dimension are re-encoded. Records whose id already
+        appears in the segments covering the batch's time range are skipped, so
+        loading the same data twice is harmless.
+        Returns the number of records appended.
+        """
         by_chat: Dict[str, list[MessageRecord]] = {}
-        for record in self._messages:
+        for record in records:
             by_chat.setdefault(record.chat_id, []).append(record)
 
-        summaries = []
-        for chat_id, records in by_chat.items():
-            last_message = max(records, key=lambda item: item.created_at)
-            summaries.append(
-                {
-                    "id": chat_id,
-                    "title": f"Chat {chat_id[:6]}",
-                    "updated_at": last_message.created_at,
-                }
+        touched: Dict[str, ProjectPartition] = {}
+        loaded = 0
+        for chat_id, chat_records in by_chat.items():
+            project, partition = self._chat_or_create(chat_id, project_id)
+            chat_records.sort(key=lambda record: record.created_at)
+            known = partition.message_ids_between(chat_records[0].created_at, chat_records[-1].created_at)
+            appended = 0
+            for record in chat_records:
+                if record.message_id in known:
+                    continue
+                if record.embedding.shape != (self._embedder.dimensions,):
+                    record.embedding = self._encode(record.content)
+                partition.append(record)
+                known.add(record.message_id)
+                appended += 1
+            project.hot_messages += appended
+            touched[project.project_id] = project
+            loaded += appended
+
+        for project in touched.values():
+            project.enforce_quota(self._segment_dir)
+        return loaded
+
+    def iter_records(self, project_id: str | None = None) -> Iterator[tuple[str, MessageRecord]]:
+        """Yield ``(project_id, record)`` pairs with at most one cold segment loaded at a time."""
+        with self._lock.read():
+            segments = [
+                (project.project_id, segment)
+                for project in self._projects.values()
+                if project_id is None or project.project_id == project_id
+                for partition in project.chats.values()
+                for segment in partition.segments
+            ]
+        # The read lock is held per segment, not across yields, so a slow
+        # consumer never blocks writers for the whole export.
+        for owner, segment in segments:
+            with self._lock.read():
+                records = list(segment.records())
+            for record in records:
+                yield owner, record
+
+    def list_segments(self) -> list[tuple[Segment, Path]]:
+        """Return every segment with the directory its files belong in."""
+        with self._lock.read():
+            return [
+                (segment, project.directory(self._segment_dir, chat_id))
+                for project in self._projects.values()
+                for chat_id, partition in project.chats.items()
+                for segment in partition.segments
+            ]
+
+    @_writes
+    def swap_embedder(
+        self,
+        embedder: Embedder,
+        embeddings: Mapping[str, np.ndarray],
+        prepared_paths: Mapping[Segment, Path],
+    ) -> list[Segment]:
+        """Switch every segment and future queries to ``embedder`` in one step.
+
+        ``embeddings`` holds precomputed vectors for hot records, keyed by message
+        id, and ``prepared_paths`` holds rewritten files for frozen segments. Hot
+        records added since are embedded here, which is cheap. Frozen segments
+        without a prepared file would need disk work under the write lock, so if
+        there are any nothing is switched and they are returned for the caller to
+        prepare first.
+        """
+        segments = [segment for segment, _ in self.list_segments()]
+        unprepared = [segment for segment in segments if not segment.hot and segment not in prepared_paths]
+        if unprepared:
+            return unprepared
+
+        def embed(record: MessageRecord) -> np.ndarray:
+            embedding = embeddings.get(record.message_id)
+            return embedding if embedding is not None else embedder.encode(record.content)
+
+        unused = dict(prepared_paths)
+        for segment in segments:
+            segment.reembed(embed, unused.pop(segment, None))
+        for path in unused.values():
+            path.unlink(missing_ok=True)
+
+        self._embedder = embedder
+        for project in self._projects.values():
+            project.clear_cache()
+        return []
+
+    def similar_messages(self, chat_id: str, content: str, limit: int = 5) -> list[MessageRecord]:
+        return self.hybrid_search(chat_id=chat_id, content=content, limit=limit).vector
+
+    @_reads
+    def hybrid_search(
+        self,
+        chat_id: str,
+        content: str,
+        limit: int = 5,
+        max_age: timedelta | None = None,
+    ) -> HybridResults:
+        """Rank a chat's messages by cosine similarity and by BM25 in a single pass.
+
+        Segments that ended more than ``max_age`` (or the store's search window)
+        before the chat's latest message are skipped, so cold history on disk is
+        only read when it is in range.
+        """
+        found = self._chat(chat_id)
+        if found is None:
+            return HybridResults(vector=[], lexical=[])
+
+        project, partition = found
+        window = max_age or self._search_window
+        since = (partition.updated_at or datetime.utcnow()) - window if window else None
+        query_embedding = project.encode(content, self._encode)
+        vector_scored: list[tuple[float, MessageRecord]] = []
+        lexical_scored: list[tuple[float, MessageRecord]] = []
+        for records, index, matrix in partition.iter_search_views(since=since):
+            if not records:
+                continue
+            # One matrix-vector product per segment; NumPy releases the GIL here,
+            # so searches in different worker threads overlap.
+            scores = matrix @ query_embedding
+            top = np.argpartition(-scores, limit)[:limit] if len(scores) > limit else range(len(scores))
+            vector_scored.extend((float(scores[position]), records[position]) for position in top)
+            lexical_scored.extend(
+                (score, records[position])
+                for position, score in index.score(content, partition.lexical_stats).items()
             )
-        return summaries
 
-    def add_file(self, chat_id: str, filename: str, content: bytes) -> str:
+        vector_scored.sort(key=lambda item: item[0], reverse=True)
+        lexical_scored.sort(key=lambda item: item[0], reverse=True)
+        return HybridResults(
+            vector=[record for _, record in vector_scored[:limit]],
+            lexical=[record for _, record in lexical_scored[:limit]],
+        )
+
+    @_reads
+    def list_chats(self, project_id: str | None = None) -> list[dict[str, object]]:
+        projects = self._projects.values()
+        if project_id is not None:
+            projects = [self._projects[project_id]] if project_id in self._projects else []
+        return [
+            {
+                "id": chat_id,
+                "title": f"Chat {chat_id[:6]}",
+                "updated_at": partition.updated_at,
+                "project_id": project.project_id,
+            }
+            for project in projects
+            for chat_id, partition in project.chats.items()
+        ]
+
+    @_writes
+    def maintain(self, now: datetime | None = None) -> list[FileRecord]:
+        """Freeze cold segments to disk and apply the retention policy.
+
+        Returns the file records of expired chats, archived or deleted, so the
+        caller can release their blobs.
+        """
+        now = now or datetime.utcnow()
+        released: list[FileRecord] = []
+        for project in self._projects.values():
+            for chat_id, partition in list(project.chats.items()):
+                directory = project.directory(self._segment_dir, chat_id)
+                expired = (
+                    self._retention is not None
+                    and partition.updated_at is not None
+                    and partition.updated_at < now - self._retention
+                )
+                if not expired:
+                    project.hot_messages -= partition.freeze_older_than(now - self._hot_window, directory)
+                    continue
+
+                project.hot_messages -= partition.hot_size
+                del project.chats[chat_id]
+                del self._chat_projects[chat_id]
+                released.extend(self._files.pop(chat_id, {}).values())
+                if self._archive_expired:
+                    partition.archive(directory, project.directory(self._archive_dir, chat_id))
+                else:
+                    partition.delete(directory)
+        return released
+
+    @_writes
+    def add_file(
+        self,
+        chat_id: str,
+        filename: str,
+        digest: str,
+        size: int,
+        content_type: str | None = None,
+        project_id: str | None = None,
+    ) -> str:
+        """Record a file reference; the bytes themselves live in the ``FileStore``."""
+        metadata = f"File:{filename}"
+        self.add_message(chat_id=chat_id, author="system", content=metadata, project_id=project_id)
         file_id = secrets.token_hex(8)
         chat_files = self._files.setdefault(chat_id, {})
-        chat_files[file_id] = content
-        metadata = f"File:{filename}"
-        self.add_message(chat_id=chat_id, author="system", content=metadata)
+        chat_files[file_id] = FileRecord(
+            file_id=file_id,
+            chat_id=chat_id,
+            filename=filename,
+            content_type=content_type,
+            digest=digest,
+            size=size,
+        )
         return file_id
 
-    def get_file(self, chat_id: str, file_id: str) -> bytes | None:
+    def get_file(self, chat_id: str, file_id: str) -> FileRecord | None:
         return self._files.get(chat_id, {}).get(file_id)
 
+    @_reads
+    def recent_messages(self, chat_id: str, limit: int) -> list[MessageRecord]:
+        """Return up to ``limit`` of a chat's newest messages, oldest first.
+
+        Segments are read newest first and reading stops once enough messages
+        were found, so older frozen segments stay on disk.
+        """
+        found = self._chat(chat_id)
+        if found is None or limit <= 0:
+            return []
+        recent: list[MessageRecord] = []
+        for segment in reversed(found[1].segments):
+            recent.extend(segment.records())
+            if len(recent) >= limit:
+                break
+        recent.sort(key=lambda record: record.created_at)
+        return recent[-limit:]
+
+    @_reads
     def get_messages(self, chat_id: str) -> list[MessageRecord]:
-        history = [record for record in self._messages if record.chat_id == chat_id]
+        found = self._chat(chat_id)
+        history: list[MessageRecord] = []
+        if found is not None:
+            for records in found[1].iter_records():
+                history.extend(records)
         history.sort(key=lambda record: record.created_at)
         return history
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import numpy as np
+
+
+def lttb(x: np.ndarray, y: np.ndarray, target: int) -> np.ndarray:
+    """Return indices of ``target`` points chosen by Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept. Each interior bucket contributes
+    the point that forms the largest triangle with the previously selected
+    point and the mean of the next bucket. The bucket loop is inherently
+    sequential, but each bucket's triangle areas are computed in one vectorized
+    step, so the Python overhead scales with ``target`` rather than ``len(x)``.
+    """
+    length = len(x)
+    if target >= length or target < 3:
+        return np.arange(length)
+
+    edges = np.linspace(1, length - 1, target - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+    # Means of every bucket, computed at once from cumulative sums.
+    x_sums = np.concatenate(([0.0], np.cumsum(x, dtype=np.float64)))
+    y_sums = np.concatenate(([0.0], np.cumsum(y, dtype=np.float64)))
+    counts = np.maximum(ends - starts, 1)
+    x_means = (x_sums[ends] - x_sums[starts]) / counts
+    y_means = (y_sums[ends] - y_sums[starts]) / counts
+    # The bucket after the last interior one is the final point itself.
+    next_x = np.append(x_means[1:], x[-1])
+    next_y = np.append(y_means[1:], y[-1])
+
+    selected = np.empty(target, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = length - 1
+    anchor = 0
+    for bucket, (start, end) in enumerate(zip(starts, ends), start=1):
+        bucket_x = x[start:end]
+        bucket_y = y[start:end]
+        areas = np.abs(
+            (x[anchor] - next_x[bucket - 1]) * (bucket_y - y[anchor])
+            - (x[anchor] - bucket_x) * (next_y[bucket - 1] - y[anchor])
+        )
+        anchor = start + int(np.argmax(areas))
+        selected[bucket] = anchor
+    return selected
+
+
+def min_max(y: np.ndarray, target: int) -> np.ndarray:
+    """Return sorted indices of each bucket's minimum and maximum, about ``target`` in total.
+
+    Fully vectorized: the series is padded into a ``(buckets, size)`` matrix and
+    reduced along rows. Cheaper than LTTB and keeps every spike, at the cost of
+    less faithful shapes.
+    """
+    length = len(y)
+    if target >= length or target < 2:
+        return np.arange(length)
+
+    buckets = target // 2
+    size = -(-length // buckets)
+    # Pad with the last value so the tail bucket needs no NaN handling; indices
+    # that land in the padding are clamped back onto the last real point.
+    padded = np.empty(buckets * size, dtype=np.float64)
+    padded[:length] = y
+    padded[length:] = y[-1]
+    rows = padded.reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    lows = offsets + np.argmin(rows, axis=1)
+    highs = offsets + np.argmax(rows, axis=1)
+    return np.unique(np.minimum(np.concatenate((lows, highs)), length - 1))
+
+
+def summarize(x: np.ndarray, y: np.ndarray) -> dict[str, float]:
+    """Compact statistics of a series, small enough to paste into a prompt."""
+    if len(y) == 0:
+        return {"points": 0}
+    x_centered = x - np.mean(x)
+    spread = float(np.dot(x_centered, x_centered))
+    slope = float(np.dot(x_centered, y - np.mean(y)) / spread) if spread else 0.0
+    return {
+        "points": int(len(y)),
+        "x_start": float(x[0]),
+        "x_end": float(x[-1]),
+        "min": float(np.min(y)),
+        "max": float(np.max(y)),
+        "mean": float(np.mean(y)),
+        "std": float(np.std(y)),
+        "last": float(y[-1]),
+        "slope": slope,
+    }
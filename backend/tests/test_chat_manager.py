@@ -0,0 +1,228 @@
+import asyncio
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from app.schemas.chat import ChatCompletionRequest
+from app.services.chat_hub import ChatHub, Subscriber
+from app.services.chat_manager import HISTORY_MAX_MESSAGES, ChatManager
+from app.services.file_store import FileStore
+from app.services.job_queue import JobQueue
+from app.services.mcp_client import MCPClient
+from app.services.openai_client import Completion, ContextHandleRejected
+from app.services.vector_store import VectorStore
+
+
+class RecordingLLM:
+    """Answers every prompt without a response id, so history is always replayed."""
+
+    def __init__(self) -> None:
+        self.prompts: list[list[dict[str, str]]] = []
+
+    async def generate(self, prompt, instructions=None, previous_response_id=None):
+        self.prompts.append(prompt)
+        return Completion(text=f"answer {len(self.prompts)}")
+
+
+class HandleLLM:
+    """Hands out response ids and fails any request that continues from one."""
+
+    def __init__(self, error: Exception) -> None:
+        self.error = error
+        self.calls: list[tuple[list[dict[str, str]], str | None]] = []
+
+    async def generate(self, prompt, instructions=None, previous_response_id=None):
+        self.calls.append((prompt, previous_response_id))
+        if previous_response_id is not None:
+            raise self.error
+        return Completion(text=f"answer {len(self.calls)}", response_id=f"resp-{len(self.calls)}")
+
+
+class StreamingLLM:
+    def __init__(self, tokens: int, stall: bool = False) -> None:
+        self.tokens = tokens
+        self.stall = stall
+
+    async def stream(self, prompt, on_delta, instructions=None, previous_response_id=None):
+        for index in range(self.tokens):
+            await on_delta(f"t{index} ")
+        if self.stall:
+            await asyncio.Event().wait()
+        return Completion(text="".join(f"t{index} " for index in range(self.tokens)))
+
+
+def _manager(tmp_path: Path, llm: RecordingLLM, job_queue: JobQueue | None = None) -> ChatManager:
+    return ChatManager(
+        llm_client=llm,
+        vector_store=VectorStore(embedding_dimensions=16, data_dir=tmp_path / "segments"),
+        mcp_client=MCPClient(),
+        file_store=FileStore(tmp_path / "files"),
+        job_queue=job_queue or JobQueue(),
+        chat_hub=ChatHub(),
+    )
+
+
+def test_history_replay_is_capped(tmp_path: Path) -> None:
+    llm = RecordingLLM()
+    manager = _manager(tmp_path, llm)
+    start = datetime.utcnow() - timedelta(days=10)
+    for index in range(300):
+        manager._vector_store.add_message(
+            "chat", "user", f"old message {index}", created_at=start + timedelta(minutes=index)
+        )
+
+    asyncio.run(manager.generate_response("chat", ChatCompletionRequest(message="latest")))
+
+    prompt = llm.prompts[0]
+    assert len(prompt) <= HISTORY_MAX_MESSAGES + 1
+    assert prompt[-2]["content"] == "old message 299"
+    assert prompt[-1]["content"].endswith("latest")
+
+
+def test_history_includes_replies_still_queued(tmp_path: Path) -> None:
+    llm = RecordingLLM()
+
+    async def scenario() -> None:
+        queue = JobQueue(workers=1)
+        await queue.start()
+        manager = _manager(tmp_path, llm, queue)
+        release = asyncio.Event()
+        # Occupy the only worker so the first reply stays queued.
+        await queue.enqueue("blocker", release.wait)
+
+        await manager.generate_response("chat", ChatCompletionRequest(message="first"))
+        await manager.generate_response("chat", ChatCompletionRequest(message="second"))
+        release.set()
+        await queue.stop()
+
+    asyncio.run(scenario())
+
+    history = [item["content"] for item in llm.prompts[1][:-1]]
+    assert history == ["first", "answer 1"]
+
+
+def test_retrieved_context_leaves_out_the_new_message(tmp_path: Path) -> None:
+    llm = RecordingLLM()
+    manager = _manager(tmp_path, llm)
+
+    asyncio.run(manager.generate_response("chat", ChatCompletionRequest(message="ERR-1042 in db.events")))
+
+    turn = llm.prompts[0][-1]["content"]
+    assert turn.startswith("Conversation context:\n\n(no prior context)")
+
+
+def test_slow_sender_receives_its_own_reply(tmp_path: Path) -> None:
+    manager = _manager(tmp_path, StreamingLLM(tokens=10))
+    subscriber = Subscriber(max_pending=8)
+    manager._chat_hub.subscribe("chat", subscriber)
+    received: list[dict[str, object]] = []
+
+    async def drain() -> None:
+        while True:
+            event = await subscriber.queue.get()
+            if event is None:
+                return
+            received.append(event)
+            await asyncio.sleep(0.001)
+
+    async def send_token(delta: str) -> None:
+        await subscriber.send({"type": "token", "chatId": "chat", "delta": delta})
+
+    async def scenario() -> None:
+        writer = asyncio.create_task(drain())
+        await manager.generate_response(
+            "chat", ChatCompletionRequest(message="hi"), on_delta=send_token, origin=subscriber
+        )
+        await subscriber.queue.put(None)
+        await writer
+
+    asyncio.run(scenario())
+
+    assert not subscriber.dropped
+    assert [event["type"] for event in received].count("message") == 2
+    assert received[-1]["message"]["content"].startswith("t0 ")
+
+
+def test_rejected_context_handle_falls_back_to_history(tmp_path: Path) -> None:
+    llm = HandleLLM(ContextHandleRejected("expired"))
+    manager = _manager(tmp_path, llm)
+
+    async def scenario() -> None:
+        await manager.generate_response("chat", ChatCompletionRequest(message="first"))
+        await manager.generate_response("chat", ChatCompletionRequest(message="second"))
+
+    asyncio.run(scenario())
+
+    assert [previous for _, previous in llm.calls] == [None, "resp-1", None]
+    history = [item["content"] for item in llm.calls[2][0][:-1]]
+    assert history == ["first", "answer 1"]
+
+
+def test_other_provider_errors_are_not_retried(tmp_path: Path) -> None:
+    llm = HandleLLM(RuntimeError("Failed to fetch response from OpenAI."))
+    manager = _manager(tmp_path, llm)
+
+    async def scenario() -> None:
+        await manager.generate_response("chat", ChatCompletionRequest(message="first"))
+        await manager.generate_response("chat", ChatCompletionRequest(message="second"))
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(scenario())
+
+    assert [previous for _, previous in llm.calls] == [None, "resp-1"]
+
+
+def _cancel_mid_stream(manager: ChatManager, cancellations: int) -> None:
+    streamed: list[str] = []
+
+    async def on_delta(delta: str) -> None:
+        streamed.append(delta)
+
+    async def scenario() -> None:
+        task = asyncio.create_task(
+            manager.generate_response("chat", ChatCompletionRequest(message="hi"), on_delta=on_delta)
+        )
+        while len(streamed) < 3:
+            await asyncio.sleep(0)
+        for _ in range(cancellations):
+            task.cancel()
+            # Let the first cancellation reach the save before the next one.
+            await asyncio.sleep(0)
+        await asyncio.gather(task, return_exceptions=True)
+        for _ in range(100):
+            if not manager._pending_replies:
+                break
+            await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_reply_keeps_the_streamed_text(tmp_path: Path) -> None:
+    manager = _manager(tmp_path, StreamingLLM(tokens=3, stall=True))
+
+    _cancel_mid_stream(manager, cancellations=1)
+
+    messages = asyncio.run(manager.get_chat_messages("chat"))
+    assert [(message.author, message.content) for message in messages] == [
+        ("user", "hi"),
+        ("assistant", "t0 t1 t2 "),
+    ]
+    assert manager.get_cancellation_metrics() == {
+        "completed": 0,
+        "cancelled": 1,
+        "cancelled_before_llm": 0,
+        "partial_tokens": 3,
+        "estimated_tokens_saved": 0,
+    }
+
+
+def test_repeated_cancellation_does_not_interrupt_the_save(tmp_path: Path) -> None:
+    manager = _manager(tmp_path, StreamingLLM(tokens=3, stall=True))
+
+    _cancel_mid_stream(manager, cancellations=2)
+
+    messages = asyncio.run(manager.get_chat_messages("chat"))
+    assert messages[-1].content == "t0 t1 t2 "
+    assert manager._pending_replies == {}
+    assert manager._job_queue.metrics()["in_flight"] == 0
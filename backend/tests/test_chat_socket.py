@@ -0,0 +1,73 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.routes import MAX_REPLIES_PER_CONNECTION
+from app.main import app
+from app.services.chat_hub import ChatHub
+from app.services.chat_manager import ChatManager
+from app.services.dependencies import get_chat_hub, get_chat_manager
+from app.services.file_store import FileStore
+from app.services.job_queue import JobQueue
+from app.services.mcp_client import MCPClient
+from app.services.vector_store import VectorStore
+
+
+class BrokenLLM:
+    async def stream(self, prompt, on_delta, instructions=None, previous_response_id=None):
+        raise TypeError("unexpected")
+
+
+class SlowLLM:
+    async def stream(self, prompt, on_delta, instructions=None, previous_response_id=None):
+        await asyncio.sleep(10)
+
+
+@pytest.fixture
+def socket_client(tmp_path: Path, request: pytest.FixtureRequest):
+    manager = ChatManager(
+        llm_client=request.param(),
+        vector_store=VectorStore(embedding_dimensions=16, data_dir=tmp_path / "segments"),
+        mcp_client=MCPClient(),
+        file_store=FileStore(tmp_path / "files"),
+        job_queue=JobQueue(),
+        chat_hub=ChatHub(),
+    )
+    hub = ChatHub()
+    app.dependency_overrides[get_chat_manager] = lambda: manager
+    app.dependency_overrides[get_chat_hub] = lambda: hub
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+
+def _receive_until(websocket, frame_type: str) -> dict[str, object]:
+    while True:
+        frame = websocket.receive_json()
+        if frame["type"] == frame_type:
+            return frame
+
+
+@pytest.mark.parametrize("socket_client", [BrokenLLM], indirect=True)
+def test_unexpected_failures_send_an_error_frame(socket_client: TestClient) -> None:
+    with socket_client.websocket_connect("/ws") as websocket:
+        websocket.send_json({"type": "message", "chatId": "c1", "message": "hi"})
+
+        frame = _receive_until(websocket, "error")
+
+    assert frame == {"type": "error", "chatId": "c1", "detail": "Internal error"}
+
+
+@pytest.mark.parametrize("socket_client", [SlowLLM], indirect=True)
+def test_in_flight_replies_are_capped_per_connection(socket_client: TestClient) -> None:
+    with socket_client.websocket_connect("/ws") as websocket:
+        for index in range(MAX_REPLIES_PER_CONNECTION + 1):
+            websocket.send_json({"type": "message", "chatId": f"c{index}", "message": "hi"})
+
+        frame = _receive_until(websocket, "error")
+
+    assert frame["chatId"] == f"c{MAX_REPLIES_PER_CONNECTION}"
+    assert frame["detail"] == "Too many replies in flight"
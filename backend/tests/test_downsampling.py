@@ -0,0 +1,88 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.services.mcp_client import GraphSeries
+from app.utils.downsampling import lttb, min_max, summarize
+
+
+def _reference_lttb(x: np.ndarray, y: np.ndarray, target: int) -> list[int]:
+    """Straightforward per-point LTTB with the same bucket edges."""
+    edges = np.linspace(1, len(x) - 1, target - 1).astype(np.int64)
+    selected = [0]
+    for bucket in range(target - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_start, next_end = edges[bucket + 1], edges[bucket + 2]
+            next_x = x[next_start:next_end].mean()
+            next_y = y[next_start:next_end].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        anchor = selected[-1]
+        best, best_area = start, -1.0
+        for index in range(start, end):
+            area = abs(
+                (x[anchor] - next_x) * (y[index] - y[anchor]) - (x[anchor] - x[index]) * (next_y - y[anchor])
+            )
+            if area > best_area:
+                best, best_area = index, area
+        selected.append(best)
+    selected.append(len(x) - 1)
+    return selected
+
+
+@pytest.mark.parametrize("length, target", [(1000, 50), (997, 13), (10, 4)])
+def test_lttb_matches_reference(length: int, target: int) -> None:
+    rng = np.random.default_rng(length)
+    x = np.arange(length, dtype=np.float64)
+    y = np.cumsum(rng.normal(size=length))
+
+    assert lttb(x, y, target).tolist() == _reference_lttb(x, y, target)
+
+
+def test_lttb_returns_everything_when_target_is_not_smaller() -> None:
+    x = np.arange(5.0)
+    assert lttb(x, x, 5).tolist() == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.parametrize("length, target", [(1000, 40), (1001, 40), (7, 4)])
+def test_min_max_keeps_every_bucket_extreme(length: int, target: int) -> None:
+    rng = np.random.default_rng(length)
+    y = rng.normal(size=length)
+
+    indices = min_max(y, target)
+
+    buckets = target // 2
+    size = -(-length // buckets)
+    expected = set()
+    for start in range(0, length, size):
+        chunk = y[start:start + size]
+        expected.update({start + int(np.argmin(chunk)), start + int(np.argmax(chunk))})
+    assert indices.tolist() == sorted(expected)
+    assert y.max() in y[indices] and y.min() in y[indices]
+
+
+def test_summarize_reports_slope_and_extremes() -> None:
+    x = np.arange(10, dtype=np.float64)
+    y = 2.0 * x + 1.0
+
+    summary = summarize(x, y)
+
+    assert summary["slope"] == pytest.approx(2.0)
+    assert (summary["min"], summary["max"], summary["last"]) == (1.0, 19.0, 19.0)
+    assert summarize(x[:0], y[:0]) == {"points": 0}
+
+
+@pytest.mark.parametrize("method", ["lttb", "minmax"])
+def test_downsampled_series_keeps_the_full_summary(method: str) -> None:
+    rng = np.random.default_rng(7)
+    x = np.arange(5000, dtype=np.float64)
+    series = GraphSeries(type="line", x=x, y=rng.normal(size=5000), description="noise")
+
+    reduced = series.downsample(50, method)
+    header = json.loads(next(reduced.iter_ndjson()))
+
+    assert len(reduced) <= 50
+    assert reduced.summary() == summarize(series.x, series.y)
+    assert header["summary"]["points"] == 5000
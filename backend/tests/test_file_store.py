@@ -0,0 +1,50 @@
+import asyncio
+import hashlib
+import io
+from pathlib import Path
+
+from fastapi import UploadFile
+
+from app.services.file_store import FileStore
+
+
+def _save(store: FileStore, data: bytes, chat_id: str = "chat"):
+    return asyncio.run(store.save(UploadFile(io.BytesIO(data), filename="upload.bin"), chat_id))
+
+
+def test_save_is_content_addressed(tmp_path: Path) -> None:
+    store = FileStore(tmp_path)
+    data = b"x" * (3 * 1024 * 1024 + 17)
+
+    first = _save(store, data)
+    second = _save(store, data)
+
+    assert first == second
+    assert first.digest == hashlib.sha256(data).hexdigest()
+    assert first.size == len(data)
+    assert store.path(first.digest).read_bytes() == data
+    assert store.reference_count(first.digest) == 2
+    assert list((tmp_path / "tmp").iterdir()) == []
+
+
+def test_blob_is_removed_with_its_last_reference(tmp_path: Path) -> None:
+    store = FileStore(tmp_path)
+    blob = _save(store, b"hello", "a")
+    _save(store, b"hello", "b")
+
+    store.release(blob.digest, "a")
+    assert store.path(blob.digest).exists()
+
+    store.release(blob.digest, "b")
+    assert not store.path(blob.digest).exists()
+    assert store.reference_count(blob.digest) == 0
+
+
+def test_saving_a_duplicate_keeps_the_blob_alive_after_the_old_owner_releases(tmp_path: Path) -> None:
+    store = FileStore(tmp_path)
+    blob = _save(store, b"shared", "old")
+
+    _save(store, b"shared", "new")
+    store.release(blob.digest, "old")
+
+    assert store.path(blob.digest).read_bytes() == b"shared"
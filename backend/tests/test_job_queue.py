@@ -0,0 +1,66 @@
+import asyncio
+
+from app.services.job_queue import JobQueue
+
+
+def test_duplicate_keys_run_once() -> None:
+    async def scenario() -> tuple[list[bool], list[str], dict[str, float]]:
+        queue = JobQueue(workers=2)
+        await queue.start()
+        calls: list[str] = []
+
+        async def job() -> None:
+            await asyncio.sleep(0.01)
+            calls.append("ran")
+
+        accepted = [await queue.enqueue("message:1", job) for _ in range(3)]
+        await queue.stop()
+        # Completed keys are remembered, so a late retry is also ignored.
+        accepted.append(await queue.enqueue("message:1", job))
+        return accepted, calls, queue.metrics()
+
+    accepted, calls, metrics = asyncio.run(scenario())
+
+    assert accepted == [True, False, False, False]
+    assert calls == ["ran"]
+    assert metrics["processed"] == 1
+
+
+def test_failed_jobs_are_retried_until_they_succeed() -> None:
+    attempts: list[int] = []
+
+    def flaky() -> None:
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise OSError("transient")
+
+    async def scenario() -> dict[str, float]:
+        queue = JobQueue(max_attempts=3, retry_delay=0.001)
+        await queue.enqueue("flaky", flaky)
+        return queue.metrics()
+
+    metrics = asyncio.run(scenario())
+
+    assert len(attempts) == 3
+    assert metrics["processed"] == 1
+    assert metrics["failed"] == 0
+
+
+def test_jobs_give_up_after_max_attempts() -> None:
+    attempts: list[int] = []
+
+    def broken() -> None:
+        attempts.append(1)
+        raise OSError("permanent")
+
+    async def scenario() -> tuple[dict[str, float], bool]:
+        queue = JobQueue(max_attempts=2, retry_delay=0.001)
+        await queue.enqueue("broken", broken)
+        # A failed key is forgotten, so it can be enqueued again.
+        return queue.metrics(), await queue.enqueue("broken", broken)
+
+    metrics, requeued = asyncio.run(scenario())
+
+    assert metrics["failed"] == 1
+    assert requeued
+    assert len(attempts) == 4
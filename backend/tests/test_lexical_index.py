@@ -0,0 +1,54 @@
+from datetime import datetime
+
+import numpy as np
+
+from app.models.records import MessageRecord
+from app.services.chat_manager import _reciprocal_rank_fusion
+from app.services.lexical_index import InvertedIndex, tokenize
+
+
+def _record(message_id: str) -> MessageRecord:
+    return MessageRecord(
+        message_id=message_id,
+        chat_id="chat",
+        author="user",
+        content=message_id,
+        created_at=datetime(2024, 1, 1),
+        embedding=np.zeros(3),
+    )
+
+
+def test_tokenize_keeps_identifiers_and_their_parts() -> None:
+    assert tokenize("Table db.events_v2 failed with ERR-1042") == [
+        "table",
+        "db.events_v2",
+        "db",
+        "events_v2",
+        "failed",
+        "with",
+        "err-1042",
+        "err",
+        "1042",
+    ]
+
+
+def test_score_prefers_rare_terms_and_higher_frequency() -> None:
+    index = InvertedIndex()
+    index.add("the build failed")
+    index.add("the build failed with ERR-1042")
+    index.add("ERR-1042 ERR-1042 again")
+    index.add("the deploy worked")
+
+    scores = index.score("ERR-1042")
+
+    assert set(scores) == {1, 2}
+    assert scores[2] > scores[1]
+    assert index.score("unknown") == {}
+
+
+def test_reciprocal_rank_fusion_rewards_agreement() -> None:
+    a, b, c = _record("a"), _record("b"), _record("c")
+
+    fused = _reciprocal_rank_fusion([[a, b, c], [b, c]], limit=2)
+
+    assert [record.message_id for record in fused] == ["b", "c"]
@@ -0,0 +1,81 @@
+import threading
+import time
+
+from app.utils.locks import ReadWriteLock
+
+
+def _start(target) -> threading.Thread:
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_readers_share_the_lock() -> None:
+    lock = ReadWriteLock()
+    inside = threading.Barrier(3, timeout=2)
+
+    def reader() -> None:
+        with lock.read():
+            inside.wait()
+
+    threads = [_start(reader) for _ in range(3)]
+    for thread in threads:
+        thread.join(2)
+
+    assert not any(thread.is_alive() for thread in threads)
+
+
+def test_writer_may_reenter_as_reader_and_writer() -> None:
+    lock = ReadWriteLock()
+
+    with lock.write():
+        with lock.read():
+            with lock.write():
+                pass
+        with lock.write():
+            pass
+
+    def other_writer() -> None:
+        with lock.write():
+            pass
+
+    # Fully released: another thread can now write.
+    thread = _start(other_writer)
+    thread.join(1)
+    assert not thread.is_alive()
+
+
+def test_waiting_writer_blocks_new_readers() -> None:
+    lock = ReadWriteLock()
+    order: list[str] = []
+    first_reader_in = threading.Event()
+    release_first_reader = threading.Event()
+
+    def first_reader() -> None:
+        with lock.read():
+            first_reader_in.set()
+            release_first_reader.wait(2)
+            order.append("reader 1")
+
+    def writer() -> None:
+        with lock.write():
+            order.append("writer")
+
+    def second_reader() -> None:
+        with lock.read():
+            order.append("reader 2")
+
+    threads = [_start(first_reader)]
+    first_reader_in.wait(2)
+    threads.append(_start(writer))
+    time.sleep(0.05)
+    threads.append(_start(second_reader))
+    time.sleep(0.05)
+    # The writer queued first, so the second reader must not have slipped in.
+    assert order == []
+
+    release_first_reader.set()
+    for thread in threads:
+        thread.join(2)
+
+    assert order == ["reader 1", "writer", "reader 2"]
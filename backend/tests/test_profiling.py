@@ -0,0 +1,110 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.profiling import (
+    RequestTrace,
+    SamplingProfiler,
+    SlowRequestMiddleware,
+    SlowRequestRecorder,
+    trace_stage,
+)
+
+
+def test_collapsed_lines_carry_self_time() -> None:
+    trace = RequestTrace(
+        name="POST /chat",
+        duration=1.0,
+        stages=[("llm;stream", 0.25), ("llm", 0.5), ("store", 0.125)],
+    )
+
+    assert trace.collapsed() == [
+        "POST /chat 375000",
+        "POST /chat;llm;stream 250000",
+        "POST /chat;llm 250000",
+        "POST /chat;store 125000",
+    ]
+
+
+def test_nested_stages_are_recorded_by_path() -> None:
+    trace = RequestTrace(name="GET /x")
+
+    with trace.stage("outer"):
+        with trace.stage("inner"):
+            pass
+
+    assert [path for path, _ in trace.stages] == ["outer;inner", "outer"]
+
+
+async def _handler(scope, receive, send) -> None:
+    with trace_stage("work"):
+        await asyncio.sleep(0.01)
+
+
+def _call(middleware: SlowRequestMiddleware, scope_type: str = "http") -> None:
+    scope = {"type": scope_type, "method": "GET", "path": "/slow"}
+    asyncio.run(middleware(scope, None, None))
+
+
+def test_middleware_records_requests_over_the_threshold() -> None:
+    fast = SlowRequestRecorder(threshold_ms=0)
+    slow = SlowRequestRecorder(threshold_ms=60_000)
+
+    _call(SlowRequestMiddleware(_handler, fast))
+    _call(SlowRequestMiddleware(_handler, slow))
+
+    [trace] = fast.traces()
+    assert trace.name == "GET /slow"
+    assert [path for path, _ in trace.stages] == ["work"]
+    assert trace.duration >= 0.01
+    assert slow.traces() == []
+
+
+def test_middleware_passes_through_when_disabled(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("CHAT_SLOW_REQUEST_MS", raising=False)
+    disabled = SlowRequestRecorder()
+    enabled = SlowRequestRecorder(threshold_ms=0)
+    seen: list[object] = []
+
+    async def app(scope, receive, send) -> None:
+        seen.append(trace_stage("work"))
+
+    _call(SlowRequestMiddleware(app, disabled))
+    _call(SlowRequestMiddleware(app, enabled), scope_type="websocket")
+
+    assert not disabled.enabled
+    assert disabled.traces() == [] and enabled.traces() == []
+    # Without a trace, stages fall back to the shared no-op context.
+    assert seen[0] is seen[1]
+
+
+def _busy_loop(stop: threading.Event) -> None:
+    while not stop.is_set():
+        time.sleep(0.001)
+
+
+def test_sampling_profiler_collects_collapsed_stacks() -> None:
+    profiler = SamplingProfiler(interval=0.001)
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_loop, args=(stop,), name="busy")
+    worker.start()
+    try:
+        profiler.start(duration=5)
+        with pytest.raises(RuntimeError):
+            profiler.start(duration=5)
+        time.sleep(0.1)
+        profiler.stop()
+        profiler._thread.join()
+    finally:
+        stop.set()
+        worker.join()
+
+    assert not profiler.running
+    lines = profiler.collapsed().splitlines()
+    busy = [line for line in lines if line.startswith("busy;")]
+    assert busy
+    stack, count = busy[0].rsplit(" ", 1)
+    assert "test_profiling.py:_busy_loop" in stack.split(";")
+    assert int(count) > 0
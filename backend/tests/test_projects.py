@@ -0,0 +1,100 @@
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from app.schemas.chat import ChatCompletionRequest, ProjectCreateRequest
+from app.services.chat_hub import ChatHub
+from app.services.chat_manager import ChatManager
+from app.services.file_store import FileStore
+from app.services.job_queue import JobQueue
+from app.services.mcp_client import MCPClient
+from app.services.openai_client import Completion
+from app.services.projects import ProjectQuota
+from app.services.vector_store import VectorStore
+
+NOW = datetime(2024, 6, 10, 12, 0)
+
+
+def _hot_by_chat(store: VectorStore) -> Counter[str]:
+    return Counter(
+        record["id"]
+        for record in store.list_chats()
+        for segment in store.get_project(str(record["project_id"])).chats[str(record["id"])].segments
+        if segment.hot
+    )
+
+
+def test_over_quota_project_freezes_only_its_own_segments(tmp_path: Path) -> None:
+    store = VectorStore(embedding_dimensions=16, data_dir=tmp_path)
+    store.ensure_project("small", name="Small", quota=ProjectQuota(max_hot_messages=10))
+    store.ensure_project("large", name="Large")
+    for day in range(5, 0, -1):
+        for index in range(5):
+            created_at = NOW - timedelta(days=day, minutes=index)
+            store.add_message("neighbour", "user", f"large {day} {index}", created_at=created_at, project_id="large")
+            store.add_message("busy", "user", f"small {day} {index}", created_at=created_at, project_id="small")
+
+    hot = _hot_by_chat(store)
+
+    assert store.get_project("small").hot_messages <= 10
+    assert hot["busy"] < 5
+    assert hot["neighbour"] == 5
+    assert store.get_project("large").hot_messages == 25
+
+
+def test_quota_never_freezes_the_segment_being_written(tmp_path: Path) -> None:
+    store = VectorStore(embedding_dimensions=16, data_dir=tmp_path)
+    store.ensure_project("small", name="Small", quota=ProjectQuota(max_hot_messages=10))
+    for index in range(200):
+        created_at = NOW + timedelta(seconds=index)
+        store.add_message("chat", "user", f"message {index}", created_at=created_at, project_id="small")
+
+    segments = store.get_project("small").chats["chat"].segments
+
+    assert len(segments) == 1 and segments[0].hot
+    assert list(tmp_path.rglob("*.npz")) == []
+
+
+class CountingLLM:
+    def __init__(self) -> None:
+        self.running: Counter[str] = Counter()
+        self.peak: Counter[str] = Counter()
+
+    async def generate(self, prompt, instructions=None, previous_response_id=None):
+        project = prompt[-1]["content"].rsplit(" ", 1)[-1]
+        self.running[project] += 1
+        self.peak[project] = max(self.peak[project], self.running[project])
+        await asyncio.sleep(0.02)
+        self.running[project] -= 1
+        return Completion(text="ok")
+
+
+def test_llm_concurrency_is_limited_per_project(tmp_path: Path) -> None:
+    llm = CountingLLM()
+    manager = ChatManager(
+        llm_client=llm,
+        vector_store=VectorStore(embedding_dimensions=16, data_dir=tmp_path / "segments"),
+        mcp_client=MCPClient(),
+        file_store=FileStore(tmp_path / "files"),
+        job_queue=JobQueue(),
+        chat_hub=ChatHub(),
+    )
+
+    async def scenario() -> None:
+        await manager.create_project(ProjectCreateRequest(id="narrow", name="Narrow", llm_concurrency=1))
+        await manager.create_project(ProjectCreateRequest(id="wide", name="Wide", llm_concurrency=3))
+        await asyncio.gather(
+            *(
+                manager.generate_response(
+                    f"{project}-{index}", ChatCompletionRequest(message=f"for {project}", projectId=project)
+                )
+                for project in ("narrow", "wide")
+                for index in range(4)
+            )
+        )
+
+    asyncio.run(scenario())
+
+    assert llm.peak["narrow"] == 1
+    assert llm.peak["wide"] == 3
@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from app.services.embeddings import HashEmbedder
+from app.services.reindex import Reindexer
+from app.services.vector_store import VectorStore
+
+NOW = datetime(2024, 6, 10, 12, 0)
+
+
+def _store(tmp_path: Path) -> VectorStore:
+    store = VectorStore(embedding_dimensions=16, data_dir=tmp_path)
+    for day in range(4):
+        for index in range(3):
+            store.add_message("chat", "user", f"day {day} message {index}", created_at=NOW - timedelta(days=day))
+    store.maintain(now=NOW)
+    return store
+
+
+def _assert_reembedded(store: VectorStore, embedder: HashEmbedder) -> None:
+    records = store.get_messages("chat")
+    assert len(records) == 12
+    for record in records:
+        np.testing.assert_allclose(record.embedding, embedder.encode(record.content), rtol=1e-6)
+    # Old files and unused prepared copies are removed after the swap.
+    assert sorted(store._segment_dir.rglob("*.npz")) == sorted(
+        segment.path for segment, _ in store.list_segments() if segment.path is not None
+    )
+
+
+def test_reindex_swaps_every_segment(tmp_path: Path) -> None:
+    store = _store(tmp_path)
+    embedder = HashEmbedder(dimensions=24)
+
+    async def scenario() -> str:
+        reindexer = Reindexer(store)
+        reindexer.start(embedder)
+        await reindexer._task
+        return reindexer.progress.state
+
+    assert asyncio.run(scenario()) == "done"
+    assert store.embedder is embedder
+    _assert_reembedded(store, embedder)
+
+
+def test_segments_frozen_during_a_run_are_prepared_before_the_swap(tmp_path: Path) -> None:
+    store = _store(tmp_path)
+    embedder = HashEmbedder(dimensions=24)
+    swap = store.swap_embedder
+    results: list[int] = []
+
+    def freeze_then_swap(*args: object) -> list[object]:
+        if not results:
+            # Maintenance freezes the hot segments after their records were
+            # embedded in memory but before the swap.
+            store.maintain(now=NOW + timedelta(days=5))
+        unprepared = swap(*args)
+        results.append(len(unprepared))
+        return unprepared
+
+    store.swap_embedder = freeze_then_swap
+
+    async def scenario() -> str:
+        reindexer = Reindexer(store)
+        reindexer.start(embedder)
+        await reindexer._task
+        return reindexer.progress.state
+
+    assert asyncio.run(scenario()) == "done"
+    assert results[0] > 0 and results[-1] == 0
+    assert store.embedder is embedder
+    assert all(not segment.hot for segment, _ in store.list_segments())
+    _assert_reembedded(store, embedder)
+
+
+def test_cancelling_during_the_swap_keeps_the_adopted_files(tmp_path: Path) -> None:
+    store = _store(tmp_path)
+    first, second = HashEmbedder(dimensions=24), HashEmbedder(dimensions=8)
+    swap = store.swap_embedder
+    entered = threading.Event()
+
+    def slow_swap(*args: object) -> list[object]:
+        entered.set()
+        time.sleep(0.1)
+        return swap(*args)
+
+    store.swap_embedder = slow_swap
+
+    async def scenario() -> tuple[str, str]:
+        reindexer = Reindexer(store)
+        reindexer.start(first)
+        await asyncio.get_running_loop().run_in_executor(None, entered.wait)
+        await reindexer.cancel()
+        cancelled_state = reindexer.progress.state
+        # Starting over must not delete files the first swap already adopted.
+        store.swap_embedder = swap
+        reindexer.start(second)
+        await reindexer._task
+        return cancelled_state, reindexer.progress.state
+
+    assert asyncio.run(scenario()) == ("done", "done")
+    assert store.embedder is second
+    _assert_reembedded(store, second)
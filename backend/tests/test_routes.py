@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.api import routes
+
+
+class DisconnectingRequest:
+    def __init__(self, polls_before_disconnect: int) -> None:
+        self.polls = 0
+        self.polls_before_disconnect = polls_before_disconnect
+
+    async def is_disconnected(self) -> bool:
+        self.polls += 1
+        return self.polls > self.polls_before_disconnect
+
+
+def test_work_is_cancelled_when_the_client_disconnects(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(routes, "DISCONNECT_POLL_SECONDS", 0.01)
+    cleaned_up = []
+
+    async def work() -> str:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cleaned_up.append(True)
+            raise
+        return "finished"
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(routes._cancel_on_disconnect(DisconnectingRequest(2), work()))
+
+    assert raised.value.status_code == routes.CLIENT_CLOSED_REQUEST == 499
+    assert cleaned_up == [True]
+
+
+def test_result_is_returned_while_the_client_stays(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(routes, "DISCONNECT_POLL_SECONDS", 0.01)
+
+    async def work() -> str:
+        await asyncio.sleep(0.05)
+        return "finished"
+
+    request = DisconnectingRequest(polls_before_disconnect=1000)
+
+    assert asyncio.run(routes._cancel_on_disconnect(request, work())) == "finished"
+    assert request.polls > 0
@@ -0,0 +1,104 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator, Iterable
+
+import numpy as np
+
+from app.services.projects import ProjectQuota
+from app.services.transfer import ImportSummary, export_ndjson, import_ndjson
+from app.services.vector_store import VectorStore
+
+NOW = datetime(2024, 6, 10, 12, 0)
+
+
+def _import(store: VectorStore, lines: Iterable[bytes], chunk_size: int = 7) -> ImportSummary:
+    payload = b"".join(lines)
+
+    async def chunks() -> AsyncIterator[bytes]:
+        # Odd chunk sizes split lines mid-way, as a network stream would.
+        for start in range(0, len(payload), chunk_size):
+            yield payload[start:start + chunk_size]
+
+    return asyncio.run(import_ndjson(store, chunks(), batch_size=3))
+
+
+def _source(tmp_path: Path) -> VectorStore:
+    store = VectorStore(embedding_dimensions=16, data_dir=tmp_path / "source")
+    store.ensure_project("p1", name="Project one", quota=ProjectQuota(max_hot_messages=100, cache_size=8))
+    for index in range(4):
+        store.add_message(
+            "c1",
+            "user",
+            f"message {index}",
+            created_at=NOW - timedelta(days=4 - index),
+            project_id="p1",
+        )
+    store.add_message("c2", "assistant", "other chat", created_at=NOW)
+    store.maintain(now=NOW)
+    return store
+
+
+def test_export_import_round_trip(tmp_path: Path) -> None:
+    source = _source(tmp_path)
+    target = VectorStore(embedding_dimensions=16, data_dir=tmp_path / "target")
+
+    summary = _import(target, export_ndjson(source))
+
+    assert summary.messages == 5
+    assert summary.skipped == 0
+    assert target.get_project("p1").quota.cache_size == 8
+    assert target.project_for_chat("c1") == "p1"
+    for chat_id in ("c1", "c2"):
+        expected = source.get_messages(chat_id)
+        loaded = target.get_messages(chat_id)
+        assert [(r.message_id, r.content, r.created_at) for r in loaded] == [
+            (r.message_id, r.content, r.created_at) for r in expected
+        ]
+        for old, new in zip(expected, loaded):
+            np.testing.assert_allclose(new.embedding, old.embedding, rtol=1e-6)
+
+
+def test_reimporting_the_same_export_skips_existing_messages(tmp_path: Path) -> None:
+    source = _source(tmp_path)
+    target = VectorStore(embedding_dimensions=16, data_dir=tmp_path / "target")
+    lines = list(export_ndjson(source))
+
+    _import(target, lines)
+    summary = _import(target, lines)
+
+    assert summary.messages == 0
+    assert summary.skipped == 5
+    assert len(target.get_messages("c1")) == 4
+
+
+def test_importing_older_history_keeps_segments_in_time_order(tmp_path: Path) -> None:
+    source = _source(tmp_path)
+    target = VectorStore(embedding_dimensions=16, data_dir=tmp_path / "target")
+    target.add_message("c1", "user", "newest", message_id="newest", created_at=NOW + timedelta(hours=1))
+
+    _import(target, export_ndjson(source))
+
+    starts = [segment.start for segment in target._chat("c1")[1].segments]
+    assert starts == sorted(starts)
+    recent = target.recent_messages("c1", 2)
+    assert [record.content for record in recent] == ["message 3", "newest"]
+
+
+def test_timezone_aware_timestamps_are_stored_as_naive_utc(tmp_path: Path) -> None:
+    store = VectorStore(embedding_dimensions=16, data_dir=tmp_path)
+    line = {
+        "type": "message",
+        "chatId": "c1",
+        "id": "m1",
+        "author": "user",
+        "content": "hello",
+        "createdAt": "2024-06-10T14:00:00+02:00",
+    }
+
+    summary = _import(store, [json.dumps(line).encode() + b"\n", b"not json\n"])
+    store.add_message("c1", "user", "follow-up")
+
+    assert (summary.messages, summary.skipped) == (1, 1)
+    assert store.get_messages("c1")[0].created_at == datetime(2024, 6, 10, 12, 0)
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from app.services.vector_store import VectorStore
+
+NOW = datetime(2024, 6, 10, 12, 0)
+
+
+def _store(tmp_path: Path, **kwargs: object) -> VectorStore:
+    return VectorStore(embedding_dimensions=32, data_dir=tmp_path, **kwargs)
+
+
+def test_bm25_scores_are_comparable_across_segments(tmp_path: Path) -> None:
+    store = _store(tmp_path)
+    old_day = NOW - timedelta(days=3)
+    for index in range(50):
+        store.add_message("chat", "user", f"routine status update {index}", created_at=old_day)
+    store.add_message("chat", "user", "saw ERR-1042 once", message_id="old", created_at=old_day)
+    store.add_message("chat", "user", "ERR-1042 ERR-1042", message_id="new", created_at=NOW)
+
+    results = store.hybrid_search("chat", "ERR-1042", limit=2)
+
+    assert [record.message_id for record in results.lexical] == ["new", "old"]
+
+
+def test_freeze_and_load_round_trip(tmp_path: Path) -> None:
+    store = _store(tmp_path)
+    for index in range(5):
+        store.add_message(
+            "chat",
+            "user" if index % 2 else "assistant",
+            f"message {index} about db.events_v2",
+            message_id=f"m{index}",
+            created_at=NOW - timedelta(days=5) + timedelta(minutes=index),
+        )
+    before = store.get_messages("chat")
+    before_hits = store.hybrid_search("chat", "message 3 db.events_v2", limit=3)
+
+    store.maintain(now=NOW)
+    segment = store.list_segments()[0][0]
+    after = store.get_messages("chat")
+    after_hits = store.hybrid_search("chat", "message 3 db.events_v2", limit=3)
+
+    assert not segment.hot
+    assert segment.path is not None and segment.path.exists()
+    assert [(r.message_id, r.author, r.content, r.created_at) for r in after] == [
+        (r.message_id, r.author, r.content, r.created_at) for r in before
+    ]
+    for old, new in zip(before, after):
+        np.testing.assert_allclose(new.embedding, old.embedding, rtol=1e-6)
+    assert [r.message_id for r in after_hits.lexical] == [r.message_id for r in before_hits.lexical]
+    assert [r.message_id for r in after_hits.vector] == [r.message_id for r in before_hits.vector]
+
+
+def test_search_window_skips_old_segments(tmp_path: Path) -> None:
+    store = _store(tmp_path)
+    store.add_message("chat", "user", "deploy failed", message_id="old", created_at=NOW - timedelta(days=30))
+    store.add_message("chat", "user", "deploy failed again", message_id="new", created_at=NOW)
+
+    windowed = store.hybrid_search("chat", "deploy failed", max_age=timedelta(days=7))
+    everything = store.hybrid_search("chat", "deploy failed")
+
+    assert [record.message_id for record in windowed.lexical] == ["new"]
+    assert {record.message_id for record in everything.lexical} == {"old", "new"}
+
+
+def test_archiving_an_expired_chat_releases_its_files(tmp_path: Path) -> None:
+    store = _store(tmp_path, retention=timedelta(days=10), archive_expired=True)
+    store.add_message("chat", "user", "hello", created_at=NOW - timedelta(days=20))
+    store.add_file("chat", filename="a.txt", digest="ab" * 32, size=5)
+
+    released = store.maintain(now=datetime.utcnow() + timedelta(days=20))
+
+    assert [record.digest for record in released] == ["ab" * 32]
+    assert store.list_chats() == []
+    assert any((tmp_path / "archive").rglob("*.npz"))
+
+
+def test_listing_frozen_messages_skips_the_lexical_index(tmp_path: Path, monkeypatch) -> None:
+    store = _store(tmp_path)
+    for index in range(3):
+        store.add_message("chat", "user", f"message {index}", created_at=NOW - timedelta(days=5))
+    store.maintain(now=NOW)
+
+    def no_index() -> None:
+        raise AssertionError("listing must not build an inverted index")
+
+    monkeypatch.setattr("app.services.segments.InvertedIndex", no_index)
+
+    assert [record.content for record in store.get_messages("chat")] == [f"message {index}" for index in range(3)]
+    assert len(store.recent_messages("chat", 2)) == 2
+    assert len(list(store.iter_records())) == 3